@@ -1,8 +1,9 @@
 #!/usr/bin/env python3
 
+import os
 import sys
 
-sys.path.append('../../day10/skgsergio')
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'day10'))
 knot = __import__('knot', globals(), locals(), [], 0)
 
 
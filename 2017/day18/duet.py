@@ -5,7 +5,6 @@ import sys
 from collections import defaultdict
 
 from queue import Queue, Empty
-from multiprocessing import pool
 
 
 def solve(ins, pid=0, qin=None, qout=None):
@@ -67,6 +66,9 @@ def part_1(ins):
 
 
 def part_2(ins):
+    # Only needed by the second part, and slow to import
+    from multiprocessing import pool
+
     p = pool.ThreadPool(processes=2)
     q1, q2 = Queue(), Queue()
 
@@ -2,7 +2,8 @@
 import sys
 
 import re
-import matplotlib.pyplot as plt
+
+from typing import List, Tuple
 
 
 rexp = re.compile(r'position=<\s*(-?\d+),\s*(-?\d+)>\s+velocity=<\s*(-?\d+),\s*(-?\d+)>')
@@ -31,23 +32,44 @@ def solve(d):
             bbx = nxt_bbx
             it += 1
 
+    return it, [(p['x'] + (p['vx'] * it), p['y'] + (p['vy'] * it)) for p in pts]
+
+
+def draw(points: List[Tuple[int, int]]) -> str:
+    xs, ys = [x for x, _ in points], [y for _, y in points]
+    lit = set(points)
+
+    return "\n".join("".join('#' if (x, y) in lit else '.' for x in range(min(xs), max(xs) + 1))
+                     for y in range(min(ys), max(ys) + 1))
+
+
+def plot(points: List[Tuple[int, int]], it: int):
+    # Only imported when plotting
+    import matplotlib.pyplot as plt
+
     fig, ax = plt.subplots()
     ax.invert_yaxis()
     ax.set_facecolor('#0f0f23')
     ax.set_aspect(1)
     ax.set_title("seconds = {}".format(it))
-    ax.plot([p['x'] + (p['vx'] * it) for p in pts],
-            [p['y'] + (p['vy'] * it) for p in pts], '*', color='#ffff66')
+    ax.plot([x for x, _ in points], [y for _, y in points], '*', color='#ffff66')
     plt.show()
 
 
 if __name__ == '__main__':
     if len(sys.argv) < 2:
-        print(f"Usage: {sys.argv[0]} <input>", file=sys.stderr)
+        print(f"Usage: {sys.argv[0]} <input> [plot]", file=sys.stderr)
         exit(1)
 
     d = None
     with open(sys.argv[1], 'r') as f:
         d = f.read().splitlines()
 
-    solve(d)
+    it, points = solve(d)
+
+    if len(sys.argv) == 3 and sys.argv[2] == "plot":
+        plot(points, it)
+
+    else:
+        print(f"Part 1:\n{draw(points)}")
+        print(f"Part 2: {it}")
@@ -1,12 +1,17 @@
 #!/usr/bin/env python3
 from __future__ import annotations
 
+import os
 import sys
 
 from enum import Enum
 from dataclasses import dataclass
 from typing import NamedTuple, List, Dict, Set, Tuple, Optional
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+
+from aoc.coords import ORTHOGONAL, pack, unpack  # noqa: E402
+
 
 class Team(Enum):
     ELF: int = 0
@@ -17,18 +22,16 @@ class Point(NamedTuple):
     x: int
     y: int
 
-    @property
-    def neighbors(self) -> List[Point]:
-        return [self + p for p in {Point(0, 1), Point(1, 0), Point(0, -1), Point(-1, 0)}]
 
-    def __add__(self, o) -> Point:
-        return Point(self.x + o.x, self.y + o.y)
+def neighbors(loc: int) -> List[int]:
+    return [loc + step for step in ORTHOGONAL]
 
 
 @dataclass
 class Unit:
     team: Team
-    loc: Point
+    # Packed Point, sorting in reading order
+    loc: int
     hp: int = 200
     ap: int = 3
 
@@ -36,15 +39,19 @@ class Unit:
     def alive(self):
         return self.hp > 0
 
+    @property
+    def point(self) -> Point:
+        return Point(*unpack(self.loc))
+
 
 class Game:
     units: List[Unit]
-    walls: Dict[Point, bool]
+    walls: Dict[int, bool]
     elfs_cant_die: bool
 
     class ElfDeath(Exception):
         def __init__(self, unit: Unit) -> None:
-            super().__init__(f"Elf died, need more AP: {unit}")
+            super().__init__(f"Elf died at {unit.point}, need more AP: {unit}")
 
     def __init__(self, gmap_input: List[str], elf_ap: Optional[int] = None, elfs_cant_die: bool = False) -> None:
         self.units = []
@@ -53,12 +60,12 @@ class Game:
 
         for x, line in enumerate(gmap_input):
             for y, ch in enumerate(line):
-                self.walls[Point(x, y)] = ch == '#'
+                self.walls[pack(x, y)] = ch == '#'
 
                 if ch in 'EG':
                     u = Unit(
                         team=Team.ELF if ch == 'E' else Team.GOBLIN,
-                        loc=Point(x, y)
+                        loc=pack(x, y)
                     )
 
                     if elf_ap and u.team == Team.ELF:
@@ -110,19 +117,19 @@ class Game:
             return True
 
         # Check if there is any enemy in the unit neighbors
-        enemy_neighbors = [e for e in enemies if e.loc in unit.loc.neighbors]
+        enemy_neighbors = [e for e in enemies if e.loc - unit.loc in ORTHOGONAL]
 
         # If there is no enemy near try to move towards one
         if not enemy_neighbors:
             # Get available possitions near enemies
-            enemies_neighbors = set(p for e in enemies for p in e.loc.neighbors)
+            enemies_neighbors = set(p for e in enemies for p in neighbors(e.loc))
             other_unit_locs = set(u.loc for u in self.units if u.alive and unit != u)
             target_locs = set(p for p in enemies_neighbors if not self.walls[p] and p not in other_unit_locs)
 
             movement = self._move(unit.loc, target_locs)
             if movement:
                 unit.loc = movement
-                enemy_neighbors = [e for e in enemies if e.loc in unit.loc.neighbors]
+                enemy_neighbors = [e for e in enemies if e.loc - unit.loc in ORTHOGONAL]
 
         # If there is at least one enemy in the neighbors attack him
         if enemy_neighbors:
@@ -137,7 +144,7 @@ class Game:
 
         return False
 
-    def _move(self, origin_loc: Point, target_locs: Set[Point]) -> Optional[Point]:
+    def _move(self, origin_loc: int, target_locs: Set[int]) -> Optional[int]:
         """
         Calcs a movement, if possible, from an origin to any target location.
 
@@ -146,12 +153,12 @@ class Game:
         # Get locs for all alive units
         unit_locs = set(u.loc for u in self.units if u.alive)
         # Dictionary of possible movements
-        possibles: Dict[Optional[Point], Tuple[int, Optional[Point]]]
+        possibles: Dict[Optional[int], Tuple[int, Optional[int]]]
         possibles = {origin_loc: (0, None)}
         # List of visits to perform
         visits = [(origin_loc, 0)]
         # Set of seen locs
-        seen: Set[Point] = set()
+        seen: Set[int] = set()
 
         new_loc = None
 
@@ -159,7 +166,7 @@ class Game:
             p, d = visits.pop(0)
             d += 1
 
-            for n in p.neighbors:
+            for n in neighbors(p):
                 # We don't want to suffocate in a wall, right?
                 if self.walls[n] or n in unit_locs:
                     continue
@@ -1,7 +1,18 @@
 #!/usr/bin/env python3
 import sys
+import time
 
-from typing import List
+from functools import partial
+
+from typing import List, Optional, Tuple
+
+
+# c + a * noun + b * verb
+Linear = Tuple[int, int, int]
+
+
+class NotLinear(Exception):
+    pass
 
 
 def program(data: List[int], n: int, v: int) -> int:
@@ -31,9 +42,115 @@ def brute(data: List[int], target: int) -> int:
     return 0
 
 
+def symbolic(data: List[int]) -> Linear:
+    """
+    Runs the program once with the noun and verb left unknown, every memory
+    cell being a linear polynomial of them. A cell read through an address
+    depending on them is unknown (None), like anything computed from it.
+    Raises NotLinear when the result, an opcode or an address is unknown or
+    depends on them, or when two of them get multiplied.
+    """
+    p: List[Optional[Linear]] = [(x, 0, 0) for x in data]
+    p[1] = (0, 1, 0)
+    p[2] = (0, 0, 1)
+    pc = 0
+
+    def const(x: Optional[Linear]) -> int:
+        if x is None or x[1] or x[2]:
+            raise NotLinear(f"[PC:{pc}] Depends on the noun or verb")
+        return x[0]
+
+    def load(x: Optional[Linear]) -> Optional[Linear]:
+        if x is None or x[1] or x[2]:
+            return None
+        return p[x[0]]
+
+    while (op := const(p[pc])) != 99:
+        a, b, dst = load(p[pc + 1]), load(p[pc + 2]), const(p[pc + 3])
+
+        if op not in (1, 2):
+            raise NotLinear(f"[PC:{pc}] Invalid operation '{op}'")
+
+        if a is None or b is None:
+            p[dst] = None
+
+        elif op == 1:
+            p[dst] = (a[0] + b[0], a[1] + b[1], a[2] + b[2])
+
+        else:
+            if a[1] or a[2]:
+                a, b = b, a
+
+            k = const(a)
+            p[dst] = (k * b[0], k * b[1], k * b[2])
+
+        pc += 4
+
+    if p[0] is None:
+        raise NotLinear("The result depends on unknown cells")
+
+    return p[0]
+
+
+def solve(poly: Linear, target: int) -> Optional[int]:
+    """Noun and verb under 100 for which c + a * noun + b * verb == target."""
+    c, a, b = poly
+
+    for n in range(100):
+        rest = target - c - a * n
+
+        if b == 0:
+            if rest == 0:
+                return 100 * n
+            continue
+
+        v, r = divmod(rest, b)
+        if r == 0 and 0 <= v < 100:
+            return 100 * n + v
+
+    return None
+
+
+def sweep_noun(data: List[int], target: int, n: int) -> Optional[int]:
+    for v in range(100):
+        if program(data, n, v) == target:
+            return 100 * n + v
+
+    return None
+
+
+def sweep(data: List[int], target: int) -> int:
+    """Brute force with one noun per task on a process pool."""
+    # Slow to import, only needed by the sweep
+    from multiprocessing import Pool
+
+    with Pool() as pool:
+        for found in pool.imap(partial(sweep_noun, data, target), range(100)):
+            if found is not None:
+                return found
+
+    return 0
+
+
+def search(data: List[int], target: int) -> int:
+    try:
+        found = solve(symbolic(data), target)
+        return found if found is not None else 0
+
+    except NotLinear:
+        return sweep(data, target)
+
+
+def bench(data: List[int], target: int):
+    for name, fn in (("brute", brute), ("sweep", sweep), ("symbolic", search)):
+        start = time.perf_counter()
+        result = fn(data, target)
+        print(f"{name:<10} {result:>6} {time.perf_counter() - start:>9.4f}s")
+
+
 if __name__ == '__main__':
     if len(sys.argv) < 2:
-        print(f"Usage: {sys.argv[0]} <input>", file=sys.stderr)
+        print(f"Usage: {sys.argv[0]} <input> [bench]", file=sys.stderr)
         exit(1)
 
     with open(sys.argv[1], 'r') as f:
@@ -41,5 +158,9 @@ if __name__ == '__main__':
 
     d = list(map(int, d))
 
+    if len(sys.argv) == 3 and sys.argv[2] == "bench":
+        bench(d, 19690720)
+        exit(0)
+
     print(f"Part 1: {program(d, 12, 2)}")
-    print(f"Part 2: {brute(d, 19690720)}")
+    print(f"Part 2: {search(d, 19690720)}")
@@ -1,163 +1,67 @@
 #!/usr/bin/env python3
+import os
 import sys
 
+from functools import partial
 from itertools import permutations
 
-from typing import List
-
-
-class Intcode:
-    def __init__(self, program: List[int], input_values: List[int],
-                 pc: int = 0, output_halts: bool = False):
-        self._d = program[:]
-        self._inputs = input_values
-        self._output_halts = output_halts
-
-        self._eop = False
-        self._pc = pc
-        self._m1 = 0
-        self._m2 = 0
-        self._m3 = 0
-        self._result = -1
-
-    # Decode functions
-    def _digit(self, value: int, i: int) -> int:
-        return (value // (10 ** i)) % 10
-
-    def _decode(self):
-        instruction = self._d[self._pc]
-
-        self._op = instruction % 100
-        self._m1 = self._digit(instruction, 2)
-        self._m2 = self._digit(instruction, 3)
-        self._m3 = self._digit(instruction, 4)
-
-    # Memory access functions
-    def _get(self, i: int, immediate_mode: int) -> int:
-        value = self._d[self._pc + i]
-        return value if immediate_mode else self._d[value]
-
-    def _set(self, i: int, value: int):
-        self._d[self._d[self._pc + i]] = value
-
-    # Operation functions
-    def _op_add(self):
-        self._set(3, self._get(1, self._m1) + self._get(2, self._m2))
-        self._pc += 4
-
-    def _op_mul(self):
-        self._set(3, self._get(1, self._m1) * self._get(2, self._m2))
-        self._pc += 4
-
-    def _op_in(self):
-        self._set(1, self._inputs.pop(0))
-        self._pc += 2
-
-    def _op_out(self):
-        self._result = self._get(1, 0)
-        self._pc += 2
-        self._eop = self._output_halts
-
-    def _op_jit(self):
-        if self._get(1, self._m1) != 0:
-            self._pc = self._get(2, self._m2)
-        else:
-            self._pc += 3
-
-    def _op_jif(self):
-        if self._get(1, self._m1) == 0:
-            self._pc = self._get(2, self._m2)
-        else:
-            self._pc += 3
-
-    def _op_lt(self):
-        self._set(3, self._get(1, self._m1) < self._get(2, self._m2))
-        self._pc += 4
-
-    def _op_eq(self):
-        self._set(3, self._get(1, self._m1) == self._get(2, self._m2))
-        self._pc += 4
-
-    def _op_eop(self):
-        self._eop = True
-
-    def _op_hcf(self):
-        raise Exception(f"[PC:{self._pc}] Invalid operation '{self._op}'")
-
-    # Exec functions
-    def _exec(self):
-        try:
-            {
-                1: self._op_add,
-                2: self._op_mul,
-                3: self._op_in,
-                4: self._op_out,
-                5: self._op_jit,
-                6: self._op_jif,
-                7: self._op_lt,
-                8: self._op_eq,
-                99: self._op_eop,
-            }[self._op]()
-
-        except IndexError:
-            self._op_hcf()
-
-    def run(self) -> int:
-        if self._eop:
-            return self._result
-
-        while not self._eop:
-            self._decode()
-            self._exec()
-
-        return self._result
+from typing import Iterable, List, Sequence
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
 
-def part1(program: List[int]) -> int:
-    signal = 0
+from intcode import Intcode, load  # noqa: E402
 
-    for p in permutations(range(5)):
-        amp = 0
 
-        for phase in p:
-            amp = Intcode(program, [phase, amp]).run()
+def chain(program: List[int], phases: Sequence[int]) -> int:
+    amp = 0
 
-        signal = max(signal, amp)
+    for phase in phases:
+        amp = Intcode(program, [phase, amp]).run_to_end()[-1]
 
-    return signal
+    return amp
 
 
-def part2(program: List[int]) -> int:
-    signal = 0
+def feedback(program: List[int], phases: Sequence[int]) -> int:
+    amps = [Intcode(program, [phase]) for phase in phases]
+    streams = [m.stream() for m in amps]
+
+    # Each amplifier writes straight into the input queue of the next one
+    amps[0].feed([0])
 
-    for p in permutations(range(5, 10)):
-        progs = []
-        inputs = []
-        for i in range(5):
-            progs.append(program[:])
-            inputs.append([p[i]])
+    last = 0
+    while not amps[-1].eop:
+        for i, stream in enumerate(streams):
+            nxt = amps[(i + 1) % len(amps)]
 
-        last = 0
-        amp = 0
-        pcs = [0] * 5
-        while amp >= 0:
-            for i in range(5):
-                inputs[i].append(amp)
+            for out in stream:
+                if out is None:
+                    break
 
-                m = Intcode(progs[i], inputs[i], pc=pcs[i], output_halts=True)
+                nxt.feed([out])
 
-                amp = m.run()
+                if nxt is amps[0]:
+                    last = out
 
-                progs[i] = m._d
-                pcs[i] = m._pc
-                inputs[i] = m._inputs
+    return last
 
-            if amp >= 0:
-                last = amp
 
-        signal = max(signal, last)
+def search(program: List[int], phases: Iterable[int], loop: bool) -> int:
+    """Max signal over every phase permutation, spread over a process pool."""
+    # Slow to import, only needed by the parallel search
+    from multiprocessing import Pool
 
-    return signal
+    with Pool() as pool:
+        signals = pool.map(partial(feedback if loop else chain, program), permutations(phases), chunksize=8)
+
+    return max(signals)
+
+
+def part1(program: List[int]) -> int:
+    return search(program, range(5), loop=False)
+
+
+def part2(program: List[int]) -> int:
+    return search(program, range(5, 10), loop=True)
 
 
 if __name__ == '__main__':
@@ -165,10 +69,7 @@ if __name__ == '__main__':
         print(f"Usage: {sys.argv[0]} <input>", file=sys.stderr)
         exit(1)
 
-    with open(sys.argv[1], 'r') as f:
-        data = f.read()
-
-    program = list(map(int, data.split(',')))
+    program = load(sys.argv[1])
 
     print(f"Part 1: {part1(program)}")
     print(f"Part 2: {part2(program)}")
@@ -1,10 +1,13 @@
 #!/usr/bin/env python3
+import os
 import sys
 
-from typing import List, Dict, Tuple, Optional
+from typing import List, Tuple
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from intcode import CompiledIntcode, load  # noqa: E402
 
-DEBUG = False
 
 TILECHR = {
     0: ' ',
@@ -15,246 +18,74 @@ TILECHR = {
 }
 
 
-class Intcode:
-    def __init__(self, program: List[int]):
-        self._d = program[:]
-
-        self._eop = False
-        self._pc = 0
-        self._rb = 0
-        self._m1 = 0
-        self._m2 = 0
-        self._m3 = 0
-        self._output = None
-
-        self._op_table = {
-            1: self._op_add,
-            2: self._op_mul,
-            3: self._op_in,
-            4: self._op_out,
-            5: self._op_jit,
-            6: self._op_jif,
-            7: self._op_lt,
-            8: self._op_eq,
-            9: self._op_arb,
-            99: self._op_eop,
-        }
-
-    # Decode functions
-    def _digit(self, value: int, i: int) -> int:
-        return (value // (10 ** i)) % 10
-
-    def _decode(self):
-        instruction = self._d[self._pc]
-
-        self._op = instruction % 100
-        self._m1 = self._digit(instruction, 2)
-        self._m2 = self._digit(instruction, 3)
-        self._m3 = self._digit(instruction, 4)
-
-        if DEBUG:
-            print(f"[DEBUG:_decode] ins: {instruction}, op: {self._op}, m: [{self._m1},{self._m2},{self._m3}]")
-
-    # Memory access functions
-    def _check_mem_size(self, i: int):
-        if DEBUG:
-            print(f"[DEBUG:_check_mem_size] i: {i}, len(d): {len(self._d)}")
-
-        if len(self._d) <= i:
-            self._d.extend([0] * (i + 1 - len(self._d)))
-
-    def _get(self, i: int, immediate_mode: int) -> int:
-        if immediate_mode == 0:
-            idx = self._d[self._pc + i]
-
-        elif immediate_mode == 1:
-            idx = self._pc + i
-
-        elif immediate_mode == 2:
-            idx = self._rb + self._d[self._pc + i]
-
-        else:
-            raise Exception(f"[PC:{self._pc}] Invalid mode '{immediate_mode}'")
-
-        self._check_mem_size(idx)
-
-        value = self._d[idx]
-
-        if DEBUG:
-            print(f"[DEBUG:_get] i: {i}, immediate_mode: {immediate_mode}, value: {value}")
-
-        return value
-
-    def _set(self, i: int, immediate_mode: int, value: int):
-        if DEBUG:
-            print(f"[DEBUG:_set] i: {i}, immediate_mode: {immediate_mode}, value: {value}")
-
-        if immediate_mode == 0:
-            idx = self._d[self._pc + i]
-
-        elif immediate_mode == 1:
-            idx = self._pc + i
-
-        elif immediate_mode == 2:
-            idx = self._rb + self._d[self._pc + i]
-
-        else:
-            raise Exception(f"[PC:{self._pc}] Invalid mode '{immediate_mode}'")
-
-        self._check_mem_size(idx)
-
-        self._d[idx] = value
-
-    # Operation functions
-    def _op_add(self):
-        self._set(3, self._m3, self._get(1, self._m1) + self._get(2, self._m2))
-        self._pc += 4
-
-    def _op_mul(self):
-        self._set(3, self._m3, self._get(1, self._m1) * self._get(2, self._m2))
-        self._pc += 4
-
-    def _op_in(self):
-        self._set(1, self._m1, self._inputs.pop(0))
-        self._pc += 2
-
-    def _op_out(self):
-        self._output = self._get(1, self._m1)
-        self._pc += 2
-
-    def _op_jit(self):
-        if self._get(1, self._m1) != 0:
-            self._pc = self._get(2, self._m2)
-        else:
-            self._pc += 3
-
-    def _op_jif(self):
-        if self._get(1, self._m1) == 0:
-            self._pc = self._get(2, self._m2)
-        else:
-            self._pc += 3
-
-    def _op_lt(self):
-        self._set(3, self._m3, self._get(1, self._m1) < self._get(2, self._m2))
-        self._pc += 4
-
-    def _op_eq(self):
-        self._set(3, self._m3, self._get(1, self._m1) == self._get(2, self._m2))
-        self._pc += 4
-
-    def _op_arb(self):
-        self._rb += self._get(1, self._m1)
-        self._pc += 2
-
-    def _op_eop(self):
-        self._eop = True
-
-    def _op_hcf(self):
-        raise Exception(f"[PC:{self._pc}] Invalid operation '{self._op}'")
-
-    # Exec functions
-    def _exec(self):
-        if self._op in self._op_table:
-            if DEBUG:
-                print(f"[DEBUG:_exec] op: {self._op}, fn: {self._op_table[self._op].__name__}")
-
-            self._op_table[self._op]()
-
-        else:
-            self._op_hcf()
-
-    def run(self, input_values: List[int]) -> Optional[int]:
-        if self._eop:
-            raise Exception(f"[EOP] Machine already in End Of Program state.")
-
-        self._inputs = input_values
-        self._output = None
-        self._halt = False
-
-        while not self._eop and self._output is None:
-            self._decode()
-            self._exec()
+def part1(data: List[int]) -> int:
+    return CompiledIntcode(data).run_to_end()[2::3].count(2)
 
-        return self._output
 
+class Screen:
+    """Fixed size tile array, only the tiles that change get redrawn."""
 
-def part1(data: List[int]) -> int:
-    m = Intcode(data)
+    def __init__(self, width: int, height: int, watch: bool = False):
+        self.width = width
+        self.height = height
+        self.tiles = [[0] * width for _ in range(height)]
+        self.score = 0
+        self.watch = watch
 
-    outputs = []
-    while True:
-        out = m.run([])
-        if m._eop:
-            break
+        if watch:
+            print('\033[2J', end='')
 
-        outputs.append(out)
+    def update(self, outputs: List[int]) -> List[Tuple[int, int, int]]:
+        changed = []
 
-    return outputs[2::3].count(2)
+        for x, y, z in zip(outputs[0::3], outputs[1::3], outputs[2::3]):
+            if (x, y) == (-1, 0):
+                self.score = z
 
+            elif self.tiles[y][x] != z:
+                self.tiles[y][x] = z
+                changed.append((x, y, z))
 
-def draw_screen(screen: Dict[Tuple[int, int], int], score):
-    frame = '\033[2J\033[1;1H'
+        if self.watch:
+            self.draw(changed)
 
-    for y in range(max(map(lambda x: x[1], screen.keys())) + 1):
-        for x in range(max(map(lambda x: x[0], screen.keys())) + 1):
-            frame += TILECHR[screen.get((x, y), 0)]
-        frame += "\n"
+        return changed
 
-    print(f"{frame}{score}")
+    def draw(self, changed: List[Tuple[int, int, int]]):
+        frame = ''.join(f'\033[{y + 1};{x + 1}H{TILECHR[z]}' for x, y, z in changed)
+        print(f'{frame}\033[{self.height + 1};1H{self.score}', end='', flush=True)
 
 
-def part2(data: List[int], print_screen: bool) -> int:
-    m = Intcode(data)
-    m._d[0] = 2  # Using Cheat Engine to hack credits
+def part2(data: List[int], watch: bool) -> int:
+    m = CompiledIntcode(data)
+    m[0] = 2  # Using Cheat Engine to hack credits
 
-    tiles = {}
+    # The game only stops for input once per frame, the first one draws the
+    # whole board and sets the screen size
+    outputs = m.run_to_end()
+    screen = Screen(max(outputs[0::3]) + 1, max(outputs[1::3]) + 1, watch)
 
-    c = 0
-    x, y, z = 0, 0, 0
     ball = 0
     paddle = 0
-    joystick = 0
-    score = 0
-    while True:
-        out = m.run([joystick])
-        if m._eop:
-            break
-
-        if c % 3 == 0:
-            x = out
-
-        elif c % 3 == 1:
-            y = out
-
-        else:
-            z = out
-
-            tiles[(x, y)] = z
 
+    while True:
+        for x, _, z in screen.update(outputs):
             if z == 4:
                 ball = x
 
             elif z == 3:
                 paddle = x
 
-            if (x, y) == (-1, 0) and z not in range(0, 5):
-                score = z
-
-            if ball < paddle:
-                joystick = -1
-
-            elif ball > paddle:
-                joystick = 1
-
-            else:
-                joystick = 0
+        if m.eop:
+            break
 
-            if print_screen:
-                draw_screen(tiles, score)
+        m.feed([(ball > paddle) - (ball < paddle)])
+        outputs = m.run_to_end()
 
-        c += 1
+    if watch:
+        print()
 
-    return score
+    return screen.score
 
 
 if __name__ == '__main__':
@@ -262,10 +93,7 @@ if __name__ == '__main__':
         print(f"Usage: {sys.argv[0]} <input> [print]", file=sys.stderr)
         exit(1)
 
-    with open(sys.argv[1], 'r') as f:
-        data = f.read()
-
-    program = list(map(int, data.split(',')))
+    program = load(sys.argv[1])
 
     p1 = part1(program)
     p2 = part2(program, len(sys.argv) == 3 and sys.argv[2] == "print")
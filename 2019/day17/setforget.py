@@ -1,196 +1,19 @@
 #!/usr/bin/env python3
+import os
 import sys
 
-from typing import List, Optional
+from typing import List
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
 
-DEBUG = False
-
-
-class Intcode:
-    def __init__(self, program: List[int],
-                 input_values: Optional[List[int]] = None):
-        self._d = program[:]
-
-        self._inputs = input_values if input_values else []
-
-        self._eop = False
-        self._pc = 0
-        self._rb = 0
-        self._m1 = 0
-        self._m2 = 0
-        self._m3 = 0
-        self._output = None
-
-        self._op_table = {
-            1: self._op_add,
-            2: self._op_mul,
-            3: self._op_in,
-            4: self._op_out,
-            5: self._op_jit,
-            6: self._op_jif,
-            7: self._op_lt,
-            8: self._op_eq,
-            9: self._op_arb,
-            99: self._op_eop,
-        }
-
-    # Decode functions
-    def _digit(self, value: int, i: int) -> int:
-        return (value // (10 ** i)) % 10
-
-    def _decode(self):
-        instruction = self._d[self._pc]
-
-        self._op = instruction % 100
-        self._m1 = self._digit(instruction, 2)
-        self._m2 = self._digit(instruction, 3)
-        self._m3 = self._digit(instruction, 4)
-
-        if DEBUG:
-            print(f"[DEBUG:_decode] ins: {instruction}, op: {self._op}, m: [{self._m1},{self._m2},{self._m3}]")
-
-    # Memory access functions
-    def _check_mem_size(self, i: int):
-        if DEBUG:
-            print(f"[DEBUG:_check_mem_size] i: {i}, len(d): {len(self._d)}")
-
-        if len(self._d) <= i:
-            self._d.extend([0] * (i + 1 - len(self._d)))
-
-    def _get(self, i: int, immediate_mode: int) -> int:
-        if immediate_mode == 0:
-            idx = self._d[self._pc + i]
-
-        elif immediate_mode == 1:
-            idx = self._pc + i
-
-        elif immediate_mode == 2:
-            idx = self._rb + self._d[self._pc + i]
-
-        else:
-            raise Exception(f"[PC:{self._pc}] Invalid mode '{immediate_mode}'")
-
-        self._check_mem_size(idx)
-
-        value = self._d[idx]
-
-        if DEBUG:
-            print(f"[DEBUG:_get] i: {i}, immediate_mode: {immediate_mode}, value: {value}")
-
-        return value
-
-    def _set(self, i: int, immediate_mode: int, value: int):
-        if DEBUG:
-            print(f"[DEBUG:_set] i: {i}, immediate_mode: {immediate_mode}, value: {value}")
-
-        if immediate_mode == 0:
-            idx = self._d[self._pc + i]
-
-        elif immediate_mode == 1:
-            idx = self._pc + i
-
-        elif immediate_mode == 2:
-            idx = self._rb + self._d[self._pc + i]
-
-        else:
-            raise Exception(f"[PC:{self._pc}] Invalid mode '{immediate_mode}'")
-
-        self._check_mem_size(idx)
-
-        self._d[idx] = value
-
-    # Operation functions
-    def _op_add(self):
-        self._set(3, self._m3, self._get(1, self._m1) + self._get(2, self._m2))
-        self._pc += 4
-
-    def _op_mul(self):
-        self._set(3, self._m3, self._get(1, self._m1) * self._get(2, self._m2))
-        self._pc += 4
-
-    def _op_in(self):
-        self._set(1, self._m1, self._inputs.pop(0))
-        self._pc += 2
-
-    def _op_out(self):
-        self._output = self._get(1, self._m1)
-        self._pc += 2
-
-    def _op_jit(self):
-        if self._get(1, self._m1) != 0:
-            self._pc = self._get(2, self._m2)
-        else:
-            self._pc += 3
-
-    def _op_jif(self):
-        if self._get(1, self._m1) == 0:
-            self._pc = self._get(2, self._m2)
-        else:
-            self._pc += 3
-
-    def _op_lt(self):
-        self._set(3, self._m3, self._get(1, self._m1) < self._get(2, self._m2))
-        self._pc += 4
-
-    def _op_eq(self):
-        self._set(3, self._m3, self._get(1, self._m1) == self._get(2, self._m2))
-        self._pc += 4
-
-    def _op_arb(self):
-        self._rb += self._get(1, self._m1)
-        self._pc += 2
-
-    def _op_eop(self):
-        self._eop = True
-
-    def _op_hcf(self):
-        raise Exception(f"[PC:{self._pc}] Invalid operation '{self._op}'")
-
-    # Exec functions
-    def _exec(self):
-        if self._op in self._op_table:
-            if DEBUG:
-                print(f"[DEBUG:_exec] op: {self._op}, fn: {self._op_table[self._op].__name__}")
-
-            self._op_table[self._op]()
-
-        else:
-            self._op_hcf()
-
-    def run(self, input_values: Optional[List[int]] = None) -> Optional[int]:
-        if self._eop:
-            raise Exception(f"[EOP] Machine already in End Of Program state.")
-
-        if input_values is not None:
-            self._inputs = input_values
-
-        self._output = None
-        self._halt = False
-
-        while not self._eop and self._output is None:
-            self._decode()
-            self._exec()
-
-        return self._output
+from intcode import Intcode, load  # noqa: E402
 
 
 def part1(data: List[int]) -> int:
     alignment = 0
 
     m = Intcode(data)
-    view = [[]]
-
-    while True:
-        out = m.run()
-        if out is None or m._eop:
-            break
-
-        if out == 10:
-            view.append([])
-
-        else:
-            view[-1].append(chr(out))
+    view = m.read().splitlines()
 
     for y in range(1, len(view) - 2):
         for x in range(len(view[y]) - 2):
@@ -198,10 +21,7 @@ def part1(data: List[int]) -> int:
                view[y][x + 1] != '.' and view[y - 1][x] != '.' and view[y + 1][x] != '.':
                 alignment += x * y
 
-    for y in range(len(view)):
-        for x in range(len(view[y])):
-            print(view[y][x], end='')
-        print()
+    print("\n".join(view))
 
     return alignment
 
@@ -252,27 +72,18 @@ def part2(data: List[int]) -> int:
     "R,4,L,4,L,4,R,8,R,10"   # B
     """
 
-    inputs = list(map(ord, (
-        "A,B,A,C,A,C,B,C,C,B\n"   # Routine
-        "L,4,L,4,L,10,R,4\n"      # A
-        "R,4,L,4,L,4,R,8,R,10\n"  # B
-        "R,4,L,10,R,10\n"         # C
-        "n\n"                     # Continous Video Feed?
-    )))
-
-    m = Intcode(data, input_values=inputs)
-    m._d[0] = 2
-
-    outputs = []
-    while True:
-        out = m.run()
-
-        if out is None or m._eop:
-            break
+    m = Intcode(data)
+    m[0] = 2
 
-        outputs.append(out)
+    m.write(
+        "A,B,A,C,A,C,B,C,C,B",   # Routine
+        "L,4,L,4,L,10,R,4",      # A
+        "R,4,L,4,L,4,R,8,R,10",  # B
+        "R,4,L,10,R,10",         # C
+        "n",                     # Continous Video Feed?
+    )
 
-    return outputs[-1]
+    return m.run_to_end()[-1]
 
 
 if __name__ == '__main__':
@@ -280,10 +91,7 @@ if __name__ == '__main__':
         print(f"Usage: {sys.argv[0]} <input>", file=sys.stderr)
         exit(1)
 
-    with open(sys.argv[1], 'r') as f:
-        data = f.read()
-
-    program = list(map(int, data.split(',')))
+    program = load(sys.argv[1])
 
     print(f"Part 1: {part1(program)}")
     print(f"Part 2: {part2(program)}")
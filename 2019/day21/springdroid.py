@@ -1,205 +1,313 @@
 #!/usr/bin/env python3
+import os
 import sys
+import time
 
-from typing import List, Optional
+from functools import partial
+from itertools import combinations
 
+from typing import Dict, Iterator, List, Optional, Sequence, Set, Tuple
 
-DEBUG = False
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
 
+from intcode import Intcode, load  # noqa: E402
 
-class Intcode:
-    def __init__(self, program: List[int],
-                 input_values: Optional[List[int]] = None):
-        self._d = program[:]
 
-        self._inputs = input_values if input_values else []
+def run(data: List[int], script: List[str]) -> int:
+    m = Intcode(data)
 
-        self._eop = False
-        self._pc = 0
-        self._rb = 0
-        self._m1 = 0
-        self._m2 = 0
-        self._m3 = 0
-        self._output = None
+    print(m.read(), end="")
+    print("\n".join(script))
 
-        self._op_table = {
-            1: self._op_add,
-            2: self._op_mul,
-            3: self._op_in,
-            4: self._op_out,
-            5: self._op_jit,
-            6: self._op_jif,
-            7: self._op_lt,
-            8: self._op_eq,
-            9: self._op_arb,
-            99: self._op_eop,
-        }
+    m.write(*script)
+    outputs = m.run_to_end()
 
-    # Decode functions
-    def _digit(self, value: int, i: int) -> int:
-        return (value // (10 ** i)) % 10
+    # The hull damage is the only value out of the ASCII range
+    print(bytes(o for o in outputs if o < 128).decode('ascii'), end="")
 
-    def _decode(self):
-        instruction = self._d[self._pc]
+    return outputs[-1]
 
-        self._op = instruction % 100
-        self._m1 = self._digit(instruction, 2)
-        self._m2 = self._digit(instruction, 3)
-        self._m3 = self._digit(instruction, 4)
 
-        if DEBUG:
-            print(f"[DEBUG:_decode] ins: {instruction}, op: {self._op}, m: [{self._m1},{self._m2},{self._m3}]")
+# Sensors each mode can read
+SENSORS = {
+    "WALK": "ABCD",
+    "RUN": "ABCDEFGHI",
+}
 
-    # Memory access functions
-    def _check_mem_size(self, i: int):
-        if DEBUG:
-            print(f"[DEBUG:_check_mem_size] i: {i}, len(d): {len(self._d)}")
+# Most instructions a script can have
+MAX_SCRIPT = 15
 
-        if len(self._d) <= i:
-            self._d.extend([0] * (i + 1 - len(self._d)))
+# A clause is an OR of (sensor, ground) literals, the jump an AND of clauses
+Clause = Tuple[Tuple[str, bool], ...]
 
-    def _get(self, i: int, immediate_mode: int) -> int:
-        if immediate_mode == 0:
-            idx = self._d[self._pc + i]
 
-        elif immediate_mode == 1:
-            idx = self._pc + i
+def evaluate(data: List[int], script: Sequence[str]) -> Tuple[Optional[int], str]:
+    """Hull damage if the script makes it across, else the hull where the droid fell."""
+    m = Intcode(data)
+    m.read()
 
-        elif immediate_mode == 2:
-            idx = self._rb + self._d[self._pc + i]
+    m.write(*script)
+    outputs = m.run_to_end()
 
-        else:
-            raise Exception(f"[PC:{self._pc}] Invalid mode '{immediate_mode}'")
+    if outputs[-1] > 127:
+        return outputs[-1], ""
 
-        self._check_mem_size(idx)
+    # The last line of every frame is the hull, the droid starting on its first tile
+    text = bytes(outputs).decode('ascii')
+    return None, next(line for line in text.splitlines() if '#' in line)
 
-        value = self._d[idx]
 
-        if DEBUG:
-            print(f"[DEBUG:_get] i: {i}, immediate_mode: {immediate_mode}, value: {value}")
+def readings(hull: str, sensors: str) -> List[int]:
+    """Sensor bits (set on ground) on every tile of the hull, ground past its end."""
+    ahead = len(sensors)
+    padded = hull + '#' * ahead
 
-        return value
+    return [sum(1 << i for i in range(ahead) if padded[pos + 1 + i] == '#') for pos in range(len(hull))]
 
-    def _set(self, i: int, immediate_mode: int, value: int):
-        if DEBUG:
-            print(f"[DEBUG:_set] i: {i}, immediate_mode: {immediate_mode}, value: {value}")
 
-        if immediate_mode == 0:
-            idx = self._d[self._pc + i]
+def springscript(script: Sequence[str], sensors: str, reading: int) -> bool:
+    """Jump decision of the script for a sensor reading."""
+    regs = {x: bool(reading >> i & 1) for i, x in enumerate(sensors)}
+    regs["T"] = regs["J"] = False
 
-        elif immediate_mode == 1:
-            idx = self._pc + i
+    for line in script:
+        op, x, y = line.split()
+        regs[y] = regs[x] and regs[y] if op == "AND" else regs[x] or regs[y] if op == "OR" else not regs[x]
 
-        elif immediate_mode == 2:
-            idx = self._rb + self._d[self._pc + i]
+    return regs["J"]
 
-        else:
-            raise Exception(f"[PC:{self._pc}] Invalid mode '{immediate_mode}'")
 
-        self._check_mem_size(idx)
+def policies(hulls: List[Tuple[str, List[int]]], jumps: Dict[int, bool]) -> Iterator[Dict[int, bool]]:
+    """Every choice of jumping on the readings met that makes it across every hull."""
+    if not hulls:
+        yield dict(jumps)
+        return
 
-        self._d[idx] = value
+    (hull, tiles), rest = hulls[0], hulls[1:]
 
-    # Operation functions
-    def _op_add(self):
-        self._set(3, self._m3, self._get(1, self._m1) + self._get(2, self._m2))
-        self._pc += 4
+    def walk(pos: int) -> Iterator[Dict[int, bool]]:
+        while pos < len(hull):
+            r = tiles[pos]
 
-    def _op_mul(self):
-        self._set(3, self._m3, self._get(1, self._m1) * self._get(2, self._m2))
-        self._pc += 4
+            if r not in jumps:
+                for jump in (False, True):
+                    jumps[r] = jump
+                    yield from walk(pos)
+                    del jumps[r]
 
-    def _op_in(self):
-        self._set(1, self._m1, self._inputs.pop(0))
-        self._pc += 2
+                return
 
-    def _op_out(self):
-        self._output = self._get(1, self._m1)
-        self._pc += 2
+            pos += 4 if jumps[r] else 1
 
-    def _op_jit(self):
-        if self._get(1, self._m1) != 0:
-            self._pc = self._get(2, self._m2)
-        else:
-            self._pc += 3
+            if pos < len(hull) and hull[pos] == '.':
+                return
 
-    def _op_jif(self):
-        if self._get(1, self._m1) == 0:
-            self._pc = self._get(2, self._m2)
-        else:
-            self._pc += 3
+        yield from policies(rest, jumps)
+
+    yield from walk(0)
+
+
+def _in_j(clause: Clause) -> List[str]:
+    """Clause computed straight in J, T being free."""
+    neg = [x for x, ground in clause if not ground]
+    pos = [x for x, ground in clause if ground]
+
+    if len(neg) == len(clause) > 3:
+        # NOT (A AND B ...) is shorter than OR-ing every NOT
+        return [f"NOT {neg[0]} T", "NOT T T"] + [f"AND {x} T" for x in neg[1:]] + ["NOT T J"]
 
-    def _op_lt(self):
-        self._set(3, self._m3, self._get(1, self._m1) < self._get(2, self._m2))
-        self._pc += 4
+    lines = [f"NOT {neg[0]} J"] if neg else [f"OR {pos.pop(0)} J"]
+    lines += [f"OR {x} J" for x in pos]
+    for x in neg[1:]:
+        lines += [f"NOT {x} T", "OR T J"]
 
-    def _op_eq(self):
-        self._set(3, self._m3, self._get(1, self._m1) == self._get(2, self._m2))
-        self._pc += 4
+    return lines
 
-    def _op_arb(self):
-        self._rb += self._get(1, self._m1)
-        self._pc += 2
 
-    def _op_eop(self):
-        self._eop = True
+def _and_j(clause: Clause) -> Optional[List[str]]:
+    """
+    Clause computed in T and AND-ed into J, None if T alone can not hold it
+    (more than one negated sensor along with plain ones).
+    """
+    neg = [x for x, ground in clause if not ground]
+    pos = [x for x, ground in clause if ground]
 
-    def _op_hcf(self):
-        raise Exception(f"[PC:{self._pc}] Invalid operation '{self._op}'")
+    if not neg and len(pos) == 1:
+        return [f"AND {pos[0]} J"]
 
-    # Exec functions
-    def _exec(self):
-        if self._op in self._op_table:
-            if DEBUG:
-                print(f"[DEBUG:_exec] op: {self._op}, fn: {self._op_table[self._op].__name__}")
+    if len(neg) == 1:
+        lines = [f"NOT {neg[0]} T"] + [f"OR {x} T" for x in pos]
+    elif not neg:
+        lines = [f"NOT {pos[0]} T", "NOT T T"] + [f"OR {x} T" for x in pos[1:]]
+    elif not pos:
+        lines = [f"NOT {neg[0]} T", "NOT T T"] + [f"AND {x} T" for x in neg[1:]] + ["NOT T T"]
+    else:
+        return None
 
-            self._op_table[self._op]()
+    return lines + ["AND T J"]
+
+
+def compile_cnf(cnf: Sequence[Clause]) -> Optional[List[str]]:
+    """Shortest springscript computing the AND of the clauses in J, if any."""
+    if not cnf:
+        return ["NOT J J"]
+
+    best = None
+    for i, first in enumerate(cnf):
+        script = _in_j(first)
+
+        for clause in cnf[:i] + cnf[i + 1:]:
+            lines = _and_j(clause)
+            if lines is None:
+                break
+
+            script += lines
 
         else:
-            self._op_hcf()
+            if best is None or len(script) < len(best):
+                best = script
 
-    def run(self, input_values: Optional[List[int]] = None) -> Optional[int]:
-        if self._eop:
-            raise Exception(f"[EOP] Machine already in End Of Program state.")
+    return best
 
-        if input_values is not None:
-            self._inputs = input_values
 
-        self._output = None
-        self._halt = False
+def learn(sensors: str, jumps: Dict[int, bool], max_clause: int = 3, max_nodes: int = 20000) -> Optional[List[str]]:
+    """
+    Shortest script found for a jump policy, as an AND of clauses true on
+    every reading that jumps and covering (being false on) every one that
+    does not. Branch and bound set cover over clauses of up to `max_clause`
+    sensors, giving up on the policy after `max_nodes` branches.
+    """
+    yes = [r for r, jump in jumps.items() if jump]
+    no = [r for r, jump in jumps.items() if not jump]
+    full = (1 << len(no)) - 1
 
-        while not self._eop and self._output is None:
-            self._decode()
-            self._exec()
+    def holds(clause: Clause, r: int) -> bool:
+        return any(bool(r >> sensors.index(x) & 1) == ground for x, ground in clause)
 
-        return self._output
+    literals = [(x, ground) for x in sensors for ground in (True, False)]
 
+    # (clause, readings it is false on, fewest instructions it can take)
+    covers: List[Tuple[Clause, int, int]] = []
 
-def run(data: List[int], script: List[str]) -> int:
-    m = Intcode(data)
-    out = 0
+    for size in range(1, max_clause + 1):
+        for clause in combinations(literals, size):
+            if len({x for x, _ in clause}) < size or not all(holds(clause, r) for r in yes):
+                continue
 
-    while out != 10:
-        out = m.run()
+            mask = sum(1 << i for i, r in enumerate(no) if not holds(clause, r))
+            if mask:
+                in_t = _and_j(clause)
+                covers.append((clause, mask, min(len(_in_j(clause)), len(in_t) if in_t else MAX_SCRIPT)))
 
-        if m._eop or out is None:
-            break
+    # Widest clauses first, so the first covers found are short
+    covers.sort(key=lambda c: (-bin(c[1]).count("1"), c[2]))
 
-        print(chr(out), end="")
+    best: List[Optional[List[str]]] = [None]
+    nodes = [0]
 
-    print("\n".join(script))
+    def cover(chosen: List[Clause], covered: int, cost: int):
+        nodes[0] += 1
+
+        if covered == full:
+            script = compile_cnf(chosen)
+            if script is not None and len(script) <= MAX_SCRIPT and (best[0] is None or len(script) < len(best[0])):
+                best[0] = script
+            return
+
+        limit = len(best[0]) if best[0] is not None else MAX_SCRIPT + 1
+
+        # Branch on the clauses covering the first reading left
+        bit = (~covered & full) & -(~covered & full)
+        for clause, mask, size in covers:
+            if nodes[0] > max_nodes:
+                return
 
-    out = m.run([ord(c) for c in "\n".join(script) + "\n"])
+            if mask & bit and cost + size < limit:
+                cover(chosen + [clause], covered | mask, cost + size)
 
-    while not m._eop:
-        out = m.run()
+    cover([], 0, 0)
 
-        if out > 255:
-            break
+    return best[0]
 
-        print(chr(out), end="")
 
-    return out
+class Search:
+    """
+    Finds a springscript program for `mode` guided by the droid failures.
+
+    Every failed run leaves the hull where the droid fell in a cache. A
+    candidate is a choice of jumping or not on each sensor reading that
+    gets the droid across every known hull, turned into the shortest
+    script found for it. Scripts are run in batches on a process pool.
+    """
+
+    def __init__(self, data: List[int], mode: str, batch: int = 4):
+        self.data = data
+        self.mode = mode
+        self.sensors = SENSORS[mode]
+        self.batch = batch
+
+        self.hulls: Set[str] = set()
+
+        self.candidates = 0
+        self.evaluated = 0
+        self.elapsed = 0.0
+
+    def solve(self) -> Tuple[List[str], int]:
+        # Slow to import, only needed once searching
+        from multiprocessing import Pool
+
+        start = time.perf_counter()
+
+        with Pool() as pool:
+            try:
+                while True:
+                    found = self.step(pool)
+
+                    if found is not None:
+                        return found
+
+            finally:
+                self.elapsed = time.perf_counter() - start
+
+    def step(self, pool) -> Optional[Tuple[List[str], int]]:
+        hulls = [(hull, readings(hull, self.sensors)) for hull in sorted(self.hulls)]
+
+        batch: List[List[str]] = []
+        for jumps in policies(hulls, {}):
+            self.candidates += 1
+
+            script = learn(self.sensors, jumps)
+            if script is None or script + [self.mode] in batch:
+                continue
+
+            # The script must agree with the policy it was learnt from
+            assert all(springscript(script, self.sensors, r) == jump for r, jump in jumps.items())
+
+            batch.append(script + [self.mode])
+            if len(batch) == self.batch:
+                break
+
+        if not batch:
+            raise Exception(f"No {self.mode} script of up to {MAX_SCRIPT} instructions "
+                            f"survives {len(self.hulls)} hulls")
+
+        known = set(self.hulls)
+        for script, (damage, hull) in zip(batch, pool.map(partial(evaluate, self.data), batch)):
+            self.evaluated += 1
+
+            if damage is not None:
+                return script, damage
+
+            if hull in known:
+                raise Exception(f"Script fell on a known hull {hull}")
+
+            self.hulls.add(hull)
+
+        return None
+
+    def report(self) -> str:
+        return (f"{self.mode}: {self.candidates:,} candidates ({self.candidates / self.elapsed:,.0f}/s), "
+                f"{self.evaluated} run on the droid, {len(self.hulls)} hulls in {self.elapsed:.2f}s")
 
 
 def part1(data: List[int]) -> int:
@@ -238,13 +346,20 @@ def part2(data: List[int]) -> int:
 
 if __name__ == '__main__':
     if len(sys.argv) < 2:
-        print(f"Usage: {sys.argv[0]} <input>", file=sys.stderr)
+        print(f"Usage: {sys.argv[0]} <input> [search]", file=sys.stderr)
         exit(1)
 
-    with open(sys.argv[1], 'r') as f:
-        data = f.read()
+    program = load(sys.argv[1])
+
+    if len(sys.argv) == 3 and sys.argv[2] == "search":
+        for part, mode in enumerate(SENSORS, start=1):
+            search = Search(program, mode)
+            script, damage = search.solve()
 
-    program = list(map(int, data.split(',')))
+            print("\n".join(script))
+            print(search.report())
+            print(f"Part {part}: {damage}")
 
-    print(f"Part 1: {part1(program)}")
-    print(f"Part 2: {part2(program)}")
+    else:
+        print(f"Part 1: {part1(program)}")
+        print(f"Part 2: {part2(program)}")
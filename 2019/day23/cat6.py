@@ -1,252 +1,143 @@
 #!/usr/bin/env python3
+import os
 import sys
+import time
 
-from typing import List, Tuple, Optional
+from collections import deque
 
+from typing import Deque, List, Optional, Set, Tuple
 
-DEBUG = False
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
 
+from intcode import Intcode, load  # noqa: E402
 
-class Intcode:
-    def __init__(self, program: List[int],
-                 input_values: Optional[List[int]] = None):
-        self._d = program[:]
 
-        self._inputs = input_values if input_values else []
+NAT = 255
 
-        self._eop = False
-        self._pc = 0
-        self._rb = 0
-        self._m1 = 0
-        self._m2 = 0
-        self._m3 = 0
-        self._output = None
+# Empty polls in a row, with nothing sent nor received, for a NIC to be idle
+IDLE_POLLS = 2
 
-        self._op_table = {
-            1: self._op_add,
-            2: self._op_mul,
-            3: self._op_in,
-            4: self._op_out,
-            5: self._op_jit,
-            6: self._op_jif,
-            7: self._op_lt,
-            8: self._op_eq,
-            9: self._op_arb,
-            99: self._op_eop,
-        }
 
-    # Decode functions
-    def _digit(self, value: int, i: int) -> int:
-        return (value // (10 ** i)) % 10
+class Network:
+    """
+    Event driven scheduler for the NICs.
 
-    def _decode(self):
-        instruction = self._d[self._pc]
+    A scheduled NIC runs until it polls its queue and finds it empty (reads
+    -1). It stays scheduled until it has polled an empty queue IDLE_POLLS
+    times in a row without sending a packet, then it is idle until one
+    arrives. When no NIC is ready none has a packet queued nor anything to
+    send, the whole network is idle and the NAT can wake it.
+    """
 
-        self._op = instruction % 100
-        self._m1 = self._digit(instruction, 2)
-        self._m2 = self._digit(instruction, 3)
-        self._m3 = self._digit(instruction, 4)
+    def __init__(self, data: List[int], ndevices: int = 50):
+        self.nics = tuple(Intcode(data, [i], empty_input=-1) for i in range(ndevices))
 
-        if DEBUG:
-            print(f"[DEBUG:_decode] ins: {instruction}, op: {self._op}, m: [{self._m1},{self._m2},{self._m3}]")
+        # Every NIC starts with its address pending
+        self.ready: Deque[int] = deque(range(ndevices))
+        self.queued: Set[int] = set(self.ready)
 
-    # Memory access functions
-    def _check_mem_size(self, i: int):
-        if DEBUG:
-            print(f"[DEBUG:_check_mem_size] i: {i}, len(d): {len(self._d)}")
+        # Empty polls of every NIC since it last sent or received a packet
+        self.idle: List[int] = [0] * ndevices
 
-        if len(self._d) <= i:
-            self._d.extend([0] * (i + 1 - len(self._d)))
+        self.nat: Optional[Tuple[int, int]] = None
 
-    def _get(self, i: int, immediate_mode: int) -> int:
-        if immediate_mode == 0:
-            idx = self._d[self._pc + i]
+        self.packets = 0
+        self.wakeups = 0
 
-        elif immediate_mode == 1:
-            idx = self._pc + i
+    def send(self, addr: int, x: int, y: int):
+        self.packets += 1
 
-        elif immediate_mode == 2:
-            idx = self._rb + self._d[self._pc + i]
+        if addr == NAT:
+            self.nat = (x, y)
+            return
 
-        else:
-            raise Exception(f"[PC:{self._pc}] Invalid mode '{immediate_mode}'")
+        self.nics[addr].feed([x, y])
+        self.idle[addr] = 0
+        self.schedule(addr)
 
-        self._check_mem_size(idx)
+    def schedule(self, c: int):
+        if c not in self.queued:
+            self.queued.add(c)
+            self.ready.append(c)
 
-        value = self._d[idx]
+    def step(self) -> bool:
+        """Run the next ready NIC until it polls an empty queue, False if the network is idle."""
+        if not self.ready:
+            return False
 
-        if DEBUG:
-            print(f"[DEBUG:_get] i: {i}, immediate_mode: {immediate_mode}, value: {value}")
+        c = self.ready.popleft()
+        self.queued.discard(c)
 
-        return value
+        nic = self.nics[c]
 
-    def _set(self, i: int, immediate_mode: int, value: int):
-        if DEBUG:
-            print(f"[DEBUG:_set] i: {i}, immediate_mode: {immediate_mode}, value: {value}")
+        while True:
+            addr = nic.run()
 
-        if immediate_mode == 0:
-            idx = self._d[self._pc + i]
+            if addr is None:
+                break
 
-        elif immediate_mode == 1:
-            idx = self._pc + i
+            x, y = nic.run(), nic.run()
+            assert x is not None and y is not None
+            self.send(addr, x, y)
+            self.idle[c] = -1
 
-        elif immediate_mode == 2:
-            idx = self._rb + self._d[self._pc + i]
+        self.idle[c] += 1
+        if self.idle[c] < IDLE_POLLS:
+            self.schedule(c)
 
-        else:
-            raise Exception(f"[PC:{self._pc}] Invalid mode '{immediate_mode}'")
+        return True
 
-        self._check_mem_size(idx)
+    def wake(self):
+        """Send the last NAT packet to address 0."""
+        assert self.nat is not None
+        self.wakeups += 1
+        self.send(0, *self.nat)
 
-        self._d[idx] = value
+    @property
+    def steps(self) -> int:
+        return sum(nic.steps for nic in self.nics)
 
-    # Operation functions
-    def _op_add(self):
-        self._set(3, self._m3, self._get(1, self._m1) + self._get(2, self._m2))
-        self._pc += 4
 
-    def _op_mul(self):
-        self._set(3, self._m3, self._get(1, self._m1) * self._get(2, self._m2))
-        self._pc += 4
+def solve(data: List[int], network: Optional[Network] = None) -> Tuple[int, int]:
+    network = network if network else Network(data)
 
-    def _op_in(self):
-        if self._inputs:
-            self._set(1, self._m1, self._inputs.pop(0))
-        else:
-            self._set(1, self._m1, -1)
-            self._output = -1
-
-        self._pc += 2
-
-    def _op_out(self):
-        self._output = self._get(1, self._m1)
-        self._pc += 2
-
-    def _op_jit(self):
-        if self._get(1, self._m1) != 0:
-            self._pc = self._get(2, self._m2)
-        else:
-            self._pc += 3
-
-    def _op_jif(self):
-        if self._get(1, self._m1) == 0:
-            self._pc = self._get(2, self._m2)
-        else:
-            self._pc += 3
-
-    def _op_lt(self):
-        self._set(3, self._m3, self._get(1, self._m1) < self._get(2, self._m2))
-        self._pc += 4
-
-    def _op_eq(self):
-        self._set(3, self._m3, self._get(1, self._m1) == self._get(2, self._m2))
-        self._pc += 4
-
-    def _op_arb(self):
-        self._rb += self._get(1, self._m1)
-        self._pc += 2
-
-    def _op_eop(self):
-        self._eop = True
-
-    def _op_hcf(self):
-        raise Exception(f"[PC:{self._pc}] Invalid operation '{self._op}'")
-
-    # Exec functions
-    def _exec(self):
-        if self._op in self._op_table:
-            if DEBUG:
-                print(f"[DEBUG:_exec] op: {self._op}, fn: {self._op_table[self._op].__name__}")
-
-            self._op_table[self._op]()
-
-        else:
-            self._op_hcf()
-
-    def run(self, input_values: Optional[List[int]] = None) -> Optional[int]:
-        if self._eop:
-            raise Exception(f"[EOP] Machine already in End Of Program state.")
-
-        if input_values is not None:
-            self._inputs = input_values
-
-        self._output = None
-        self._halt = False
-
-        while not self._eop and self._output is None:
-            self._decode()
-            self._exec()
-
-        return self._output
-
-
-def solve(data: List[int]) -> Tuple[int, int]:
     part1 = -1
-    part2 = -1
-
-    ndevices = 50
-    network = tuple(Intcode(data, [i]) for i in range(ndevices))
-
-    i = 0
-    addr = 0
-
-    x, y = 0, 0
-    natx, naty = 0, 0
-
-    last_naty = -1
-    idle_counter = 0
-
-    while part1 < 0 or part2 < 0:
-        addr = network[i].run()
+    last_naty = None
 
-        if addr != -1:
-            idle_counter = 0
-            x = network[i].run()
-            y = network[i].run()
+    while True:
+        if network.step():
+            if part1 < 0 and network.nat is not None:
+                part1 = network.nat[1]
 
-            if addr == 255:
-                natx = x
-                naty = y
+            continue
 
-                if part1 < 0:
-                    part1 = naty
+        if network.nat is None:
+            raise Exception(f"Network idle after {network.packets} packets, none of them to the NAT")
 
-            else:
-                network[addr]._inputs.append(x)
-                network[addr]._inputs.append(y)
+        naty = network.nat[1]
+        if naty == last_naty:
+            return part1, naty
 
-                i = addr
-
-        else:
-            i = (i + 1) % ndevices
-
-            if all(len(network[c]._inputs) == 0 for c in range(len(network))):
-                idle_counter += 1
-
-                if idle_counter == ndevices**2:
-                    if last_naty == naty:
-                        part2 = naty
-
-                    idle_counter = 0
-                    last_naty = naty
-
-                    network[0]._inputs.append(natx)
-                    network[0]._inputs.append(naty)
-
-    return part1, part2
+        last_naty = naty
+        network.wake()
 
 
 if __name__ == '__main__':
     if len(sys.argv) < 2:
-        print(f"Usage: {sys.argv[0]} <input>", file=sys.stderr)
+        print(f"Usage: {sys.argv[0]} <input> [stats]", file=sys.stderr)
         exit(1)
 
-    with open(sys.argv[1], 'r') as f:
-        data = f.read()
+    program = load(sys.argv[1])
 
-    program = list(map(int, data.split(',')))
+    network = Network(program)
 
-    part1, part2 = solve(program)
+    start = time.perf_counter()
+    part1, part2 = solve(program, network)
+    elapsed = time.perf_counter() - start
 
     print(f"Part 1: {part1}")
     print(f"Part 2: {part2}")
+
+    if len(sys.argv) == 3 and sys.argv[2] == "stats":
+        print(f"Packets: {network.packets} ({network.packets / elapsed:,.0f}/s), NAT wakeups: {network.wakeups}")
+        print(f"Instructions: {network.steps:,} ({network.steps / network.packets:,.1f}/packet)")
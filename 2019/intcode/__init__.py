@@ -0,0 +1,6 @@
+from .jit import CompiledIntcode
+from .memory import PagedMemory
+from .program import load, parse
+from .vm import Intcode, decode
+
+__all__ = ["CompiledIntcode", "Intcode", "PagedMemory", "decode", "load", "parse"]
@@ -0,0 +1,322 @@
+#!/usr/bin/env python3
+"""
+Static analysis of Intcode programs: control flow graph, loops and the
+idioms inside them that have a closed form in Python.
+
+Usage (from the 2019 directory):
+  python3 -m intcode.analyze <input> [--cfg] [--entry PC ...]
+"""
+import argparse
+import sys
+
+from typing import Dict, List, NamedTuple, Optional, Sequence, Set, Tuple
+
+from .disasm import BasicBlock, Instruction, cfg, operand
+
+
+# A memory operand as (mode, param), only meaningful while rb does not change
+Slot = Tuple[int, int]
+
+
+class Loop(NamedTuple):
+    head: int
+    blocks: Tuple[int, ...]
+    instructions: Tuple[Instruction, ...]
+
+
+class Idiom(NamedTuple):
+    kind: str
+    loop: Loop
+    # Equivalent Python, operands written as in the disassembly
+    native: str
+
+
+def loops(blocks: Dict[int, BasicBlock]) -> List[Loop]:
+    """Natural loops, one per back edge found by a depth first search."""
+    preds: Dict[int, Set[int]] = {start: set() for start in blocks}
+    for start, block in blocks.items():
+        for succ in block.succs:
+            if succ in preds:
+                preds[succ].add(start)
+
+    back_edges: List[Tuple[int, int]] = []
+    state: Dict[int, bool] = {}
+
+    for root in sorted(blocks):
+        if root in state:
+            continue
+
+        # Iterative DFS, state is True while the block is on the stack
+        state[root] = True
+        stack = [(root, iter(blocks[root].succs))]
+
+        while stack:
+            node, succs = stack[-1]
+
+            for succ in succs:
+                if succ not in blocks:
+                    continue
+
+                if state.get(succ) is True:
+                    back_edges.append((node, succ))
+
+                elif succ not in state:
+                    state[succ] = True
+                    stack.append((succ, iter(blocks[succ].succs)))
+                    break
+
+            else:
+                state[node] = False
+                stack.pop()
+
+    found = []
+    for tail, head in back_edges:
+        body = {head, tail}
+        pending = [tail] if tail != head else []
+
+        while pending:
+            for pred in preds[pending.pop()]:
+                if pred not in body:
+                    body.add(pred)
+                    pending.append(pred)
+
+        starts = tuple(sorted(body))
+        found.append(Loop(head, starts, tuple(ins for s in starts for ins in blocks[s].instructions)))
+
+    return sorted(found, key=lambda loop: (loop.head, len(loop.blocks)))
+
+
+def innermost(found: List[Loop]) -> List[Loop]:
+    """Loops with no other loop inside them."""
+    sets = [set(loop.blocks) for loop in found]
+    return [loop for loop, blocks in zip(found, sets) if not any(other < blocks for other in sets)]
+
+
+def text(slot: Slot) -> str:
+    return operand(*slot)
+
+
+def writes(ins: Instruction) -> Optional[Slot]:
+    if ins.op in (1, 2, 7, 8):
+        return ins.operands[2]
+
+    if ins.op == 3:
+        return ins.operands[0]
+
+    return None
+
+
+class _Body:
+    """What a loop reads and writes."""
+
+    def __init__(self, loop: Loop):
+        self.loop = loop
+        self.code = {ins.pc: ins for ins in loop.instructions}
+        self.written = {w for w in map(writes, loop.instructions) if w is not None}
+        self.moves_rb = any(ins.op == 9 for ins in loop.instructions)
+
+    def invariant(self, slot: Slot) -> bool:
+        return slot[0] == 1 or slot not in self.written
+
+    def patched(self, slot: Slot) -> Optional[Tuple[Instruction, int]]:
+        """Instruction (and parameter index) whose operand the slot overwrites."""
+        if slot[0] != 0:
+            return None
+
+        for ins in self.loop.instructions:
+            if ins.pc < slot[1] < ins.next:
+                return ins, slot[1] - ins.pc - 1
+
+        return None
+
+    def step(self, ins: Instruction) -> Optional[Tuple[Slot, Slot]]:
+        """(var, delta) for an ADD var delta var, delta being invariant."""
+        if ins.op != 1:
+            return None
+
+        a, b, dst = ins.operands
+        for var, delta in ((a, b), (b, a)):
+            if var == dst and var[0] != 1 and self.invariant(delta):
+                return var, delta
+
+        return None
+
+    def exits(self) -> List[Tuple[Instruction, Slot]]:
+        """Conditional jumps in the loop and the slot they test."""
+        return [(ins, ins.operands[0]) for ins in self.loop.instructions
+                if ins.op in (5, 6) and ins.operands[0][0] != 1]
+
+    def compares(self, slot: Slot) -> Optional[Instruction]:
+        """LT/EQ in the loop whose result is tested on `slot`."""
+        for ins in self.loop.instructions:
+            if ins.op in (7, 8) and ins.operands[2] == slot:
+                return ins
+
+        return None
+
+
+# Times a loop doing `v += d` runs once the condition holds, by (comparison,
+# v on the left, loop goes on when the comparison holds)
+_ADD_TIMES = {
+    (7, True, True): "-(({v} - {b}) // {d})",      # while v < b
+    (7, True, False): "({v} - {b}) // -{d} + 1",   # while v >= b
+    (7, False, True): "-(({b} - {v}) // -{d})",    # while v > b
+    (7, False, False): "({b} - {v}) // {d} + 1",   # while v <= b
+    (8, True, False): "({b} - {v}) // {d}",        # while v != b
+    (8, False, False): "({b} - {v}) // {d}",
+}
+
+
+def recognize(loop: Loop) -> List[Idiom]:
+    body = _Body(loop)
+    found: List[Idiom] = []
+
+    if body.moves_rb:
+        return found
+
+    steps = [s for s in map(body.step, loop.instructions) if s is not None]
+    tested: Dict[Slot, Tuple[Instruction, Optional[Instruction]]] = {}
+    for jmp, cond in body.exits():
+        cmp = body.compares(cond)
+        tested[cond] = (jmp, None)
+        if cmp is not None:
+            for operand_slot in cmp.operands[:2]:
+                tested.setdefault(operand_slot, (jmp, cmp))
+
+    for var, delta in steps:
+        if var not in tested:
+            continue
+
+        v, d = text(var), text(delta)
+        if d.startswith('-'):
+            d = f"({d})"
+        jmp, cmp = tested[var]
+
+        if cmp is None:
+            if delta == (1, -1):
+                found.append(Idiom("countdown", loop, f"repeat {v} times; {v} = 0"))
+            continue
+
+        other = cmp.operands[1] if cmp.operands[0] == var else cmp.operands[0]
+        if not body.invariant(other):
+            continue
+
+        bound = text(other)
+
+        # Whether the loop goes on when the comparison holds, only for jumps
+        # with one side leaving the loop
+        taken_on_true = jmp.op == 5
+        stays = (jmp.operands[1][0] == 1 and jmp.params[1] in loop.blocks, jmp.next in loop.blocks)
+        if stays == (True, False):
+            goes_on = taken_on_true
+        elif stays == (False, True):
+            goes_on = not taken_on_true
+        else:
+            continue
+
+        relation = {(7, True): "<", (7, False): ">=", (8, True): "==", (8, False): "!="}[cmp.op, goes_on]
+        condition = f"{text(cmp.operands[0])} {relation} {text(cmp.operands[1])}"
+
+        if len(loop.instructions) == 3:
+            # Nothing else in the loop: it adds until the condition breaks
+            times = _ADD_TIMES.get((cmp.op, cmp.operands[0] == var, goes_on))
+
+            if times is not None:
+                native = f"{v} += {d}; if {condition}: {v} += {d} * ({times.format(v=v, b=bound, d=d)})"
+                found.append(Idiom("repeated-add", loop, native))
+
+        elif delta in ((1, 1), (1, -1)):
+            kind = "count-up" if delta == (1, 1) else "countdown"
+            found.append(Idiom(kind, loop, f"for {v} in range({v}, {bound}, {d})  # while {condition}"))
+
+    # Loops walking memory by patching the operands of their own instructions
+    for ins in loop.instructions:
+        dst = writes(ins)
+        target = body.patched(dst) if dst is not None else None
+        if target is None:
+            continue
+
+        patched, index = target
+        pointer = f"ptr{patched.pc}"
+
+        step = body.step(ins)
+        if step is not None:
+            walk = f"{pointer} += {text(step[1])}"
+        else:
+            neutral = (1, 0) if ins.op == 1 else (1, 1)
+            terms = [text(s) for s in ins.operands[:2] if s != neutral] or [text(neutral)]
+            walk = f"{pointer} = {(' + ' if ins.op == 1 else ' * ').join(terms)}"
+
+        if patched.op == 4:
+            found.append(Idiom("print", loop, f"out(mem[{pointer}]); {walk}"))
+
+        elif patched.op in (1, 2) and index == 2:
+            # A move is an ADD of 0 or a MUL by 1
+            neutral = (1, 0) if patched.op == 1 else (1, 1)
+            a, b = patched.operands[:2]
+            if neutral not in (a, b):
+                continue
+
+            src = b if a == neutral else a
+            src_at = patched.pc + (2 if a == neutral else 1)
+
+            if body.invariant(src):
+                found.append(Idiom("memset", loop, f"mem[{pointer}] = {text(src)}; {walk}"))
+            elif (0, src_at) in body.written:
+                found.append(Idiom("memcpy", loop, f"mem[{pointer}] = mem[ptr{src_at}]; {walk}"))
+            else:
+                found.append(Idiom("indexed-store", loop, f"mem[{pointer}] = {text(src)}; {walk}"))
+
+        elif patched.op == 3 and index == 0:
+            found.append(Idiom("read", loop, f"mem[{pointer}] = inp(); {walk}"))
+
+        elif writes(patched) is None or index < len(patched.params) - 1:
+            found.append(Idiom("indexed-load", loop, f"... mem[{pointer}] ...; {walk}"))
+
+    return found
+
+
+def print_cfg(blocks: Dict[int, BasicBlock]):
+    for start, block in sorted(blocks.items()):
+        succs = ", ".join("?" if s is None else str(s) for s in block.succs) or "-"
+        print(f"block {start}..{block.end - 1} -> {succs}")
+
+        for ins in block.instructions:
+            print(f"  {ins.pc:>6}  {ins}")
+
+
+def main(argv: Optional[Sequence[str]] = None):
+    parser = argparse.ArgumentParser(description="Intcode control flow graph and loop idioms")
+    parser.add_argument("input", help="Intcode program")
+    parser.add_argument("--cfg", action="store_true", help="print the basic blocks too")
+    parser.add_argument("--entry", type=int, nargs="*", default=[], help="extra entry points (jump tables)")
+    args = parser.parse_args(argv)
+
+    with open(args.input, 'r') as f:
+        program = list(map(int, f.read().split(',')))
+
+    blocks = cfg(program, [0] + args.entry)
+    found = innermost(loops(blocks))
+
+    if args.cfg:
+        print_cfg(blocks)
+        print()
+
+    code = sum(len(ins.params) + 1 for b in blocks.values() for ins in b.instructions)
+    indirect = sum(None in b.succs for b in blocks.values())
+    print(f"{len(program)} words, {code} reached as code, {len(blocks)} blocks ({indirect} end in indirect jumps), "
+          f"{len(found)} innermost loops")
+
+    for loop in found:
+        idioms = recognize(loop)
+
+        if not idioms:
+            continue
+
+        print(f"loop at {loop.head} ({len(loop.instructions)} instructions, blocks {', '.join(map(str, loop.blocks))})")
+        for idiom in idioms:
+            print(f"  {idiom.kind:<12} {idiom.native}")
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,159 @@
+"""
+Lockstep execution of many copies of the same Intcode program.
+
+Every lane gets its own memory row, pc and relative base, each step decodes
+and executes the current instruction of all the running lanes at once with
+NumPy, so lanes following different paths through the program still share
+the work. Values are int64, programs that overflow it need the scalar VM.
+Memory grows for every lane when one of them runs or writes past its end.
+"""
+from typing import List, Optional, Sequence
+
+import numpy as np
+
+
+# Instruction size for every opcode, 0 for invalid ones
+SIZE = np.zeros(100, dtype=np.int64)
+SIZE[[1, 2, 7, 8]] = 4
+SIZE[[3, 4, 9]] = 2
+SIZE[[5, 6]] = 3
+SIZE[99] = 1
+
+# Parameters every opcode uses, the others are not decoded
+PARAMS = np.maximum(SIZE - 1, 0)
+
+
+def run_batch(program: List[int], inputs: Sequence[Sequence[int]],
+              memory_size: Optional[int] = None) -> List[List[int]]:
+    """
+    Run one copy of `program` per row of `inputs`, returning the outputs of
+    each lane. A lane stops on end of program or when it runs out of input.
+    """
+    lanes = len(inputs)
+    size = max(memory_size, len(program)) if memory_size else max(2 * len(program), 4096)
+
+    mem = np.zeros((lanes, size), dtype=np.int64)
+    mem[:, :len(program)] = program
+
+    width = max((len(i) for i in inputs), default=0)
+    inp = np.zeros((lanes, width + 1), dtype=np.int64)
+    n_inputs = np.zeros(lanes, dtype=np.int64)
+    for lane, values in enumerate(inputs):
+        inp[lane, :len(values)] = values
+        n_inputs[lane] = len(values)
+
+    pc = np.zeros(lanes, dtype=np.int64)
+    rb = np.zeros(lanes, dtype=np.int64)
+    ip = np.zeros(lanes, dtype=np.int64)
+    running = np.ones(lanes, dtype=bool)
+
+    outputs: List[List[int]] = [[] for _ in range(lanes)]
+
+    def grow(address: int):
+        """Widen the memory of every lane so `address` exists, doubling it at least."""
+        nonlocal mem, size
+
+        size = max(2 * size, address + 1)
+        mem = np.concatenate((mem, np.zeros((lanes, size - mem.shape[1]), dtype=np.int64)), axis=1)
+
+    def invalid(lanes_at: np.ndarray, at: np.ndarray) -> Exception:
+        lane = idx[lanes_at][0]
+        return Exception(f"[LANE:{lane}][PC:{pc[lane]}] Invalid memory access {at[lanes_at][0]}")
+
+    while running.any():
+        idx = np.flatnonzero(running)
+        p = pc[idx]
+        b = rb[idx]
+
+        if (p < 0).any():
+            raise invalid(p < 0, p)
+
+        if p.max() + 3 >= size:
+            grow(int(p.max()) + 3)
+
+        word = mem[idx, p]
+        op = word % 100
+
+        if (SIZE[op] == 0).any():
+            lane = idx[SIZE[op] == 0][0]
+            raise Exception(f"[LANE:{lane}][PC:{pc[lane]}] Invalid operation '{mem[lane, pc[lane]] % 100}'")
+
+        def read(at: np.ndarray) -> np.ndarray:
+            # Memory past the end of a lane reads as zeros, like the growing memory of the VM
+            if (at < 0).any():
+                raise invalid(at < 0, at)
+
+            return np.where(at < size, mem[idx, np.minimum(at, size - 1)], 0)
+
+        # Parameter addresses and values of the three possible parameters,
+        # address 0 for the ones the instruction does not have
+        addrs = []
+        for i, mode in enumerate((word // 100 % 10, word // 1000 % 10, word // 10000 % 10), start=1):
+            used = PARAMS[op] >= i
+
+            if (used & (mode > 2)).any():
+                lane = idx[used & (mode > 2)][0]
+                raise Exception(f"[LANE:{lane}][PC:{pc[lane]}] Invalid mode '{mode[used & (mode > 2)][0]}'")
+
+            at = p + i
+            raw = read(np.where(used, at, 0))
+            addrs.append(np.where(used, np.where(mode == 0, raw, np.where(mode == 1, at, b + raw)), 0))
+
+        v1 = read(addrs[0])
+        v2 = read(addrs[1])
+
+        npc = p + SIZE[op]
+
+        def write(sel: np.ndarray, target: np.ndarray, values: np.ndarray):
+            if (sel & (target < 0)).any():
+                raise invalid(sel & (target < 0), target)
+
+            if (target[sel] >= size).any():
+                grow(int(target[sel].max()))
+
+            mem[idx[sel], target[sel]] = values
+
+        sel = op == 1
+        if sel.any():
+            write(sel, addrs[2], v1[sel] + v2[sel])
+
+        sel = op == 2
+        if sel.any():
+            write(sel, addrs[2], v1[sel] * v2[sel])
+
+        sel = op == 7
+        if sel.any():
+            write(sel, addrs[2], v1[sel] < v2[sel])
+
+        sel = op == 8
+        if sel.any():
+            write(sel, addrs[2], v1[sel] == v2[sel])
+
+        sel = op == 3
+        if sel.any():
+            starved = sel & (ip[idx] >= n_inputs[idx])
+            running[idx[starved]] = False
+            npc[starved] = p[starved]
+
+            sel &= ~starved
+            write(sel, addrs[0], inp[idx[sel], ip[idx[sel]]])
+            ip[idx[sel]] += 1
+
+        sel = op == 4
+        if sel.any():
+            for lane, value in zip(idx[sel].tolist(), v1[sel].tolist()):
+                outputs[lane].append(value)
+
+        sel = (op == 5) & (v1 != 0) | (op == 6) & (v1 == 0)
+        npc[sel] = v2[sel]
+
+        sel = op == 9
+        rb[idx[sel]] += v1[sel]
+
+        sel = op == 99
+        running[idx[sel]] = False
+        npc[sel] = p[sel]
+
+        pc[idx] = npc
+
+    return outputs
@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""
+Intcode micro-benchmarks.
+
+  boost: BOOST (day09) part 2, a single long running machine.
+  beam:  tractor beam (day19) part 1, 2500 short lived probes.
+
+Usage (from the 2019 directory): python3 -m intcode.bench [boost|beam] [input]
+"""
+import sys
+import time
+
+from typing import Callable, List, Tuple
+
+from .jit import CompiledIntcode
+from .memory import PagedMemory
+from .vm import Intcode
+
+
+class LegacyIntcode:
+    """Per-day interpreter the 2019 days used to carry, kept as baseline."""
+
+    def __init__(self, program: List[int], input_values: List[int]):
+        self._d = program[:]
+        self._inputs = input_values
+
+        self._eop = False
+        self._pc = 0
+        self._rb = 0
+        self._m1 = 0
+        self._m2 = 0
+        self._m3 = 0
+        self._result = -1
+
+        self._op_table = {
+            1: self._op_add,
+            2: self._op_mul,
+            3: self._op_in,
+            4: self._op_out,
+            5: self._op_jit,
+            6: self._op_jif,
+            7: self._op_lt,
+            8: self._op_eq,
+            9: self._op_arb,
+            99: self._op_eop,
+        }
+
+    def _digit(self, value: int, i: int) -> int:
+        return (value // (10 ** i)) % 10
+
+    def _decode(self):
+        instruction = self._d[self._pc]
+
+        self._op = instruction % 100
+        self._m1 = self._digit(instruction, 2)
+        self._m2 = self._digit(instruction, 3)
+        self._m3 = self._digit(instruction, 4)
+
+    def _check_mem_size(self, i: int):
+        if len(self._d) <= i:
+            self._d.extend([0] * (i + 1 - len(self._d)))
+
+    def _addr(self, i: int, immediate_mode: int) -> int:
+        if immediate_mode == 0:
+            idx = self._d[self._pc + i]
+
+        elif immediate_mode == 1:
+            idx = self._pc + i
+
+        else:
+            idx = self._rb + self._d[self._pc + i]
+
+        self._check_mem_size(idx)
+
+        return idx
+
+    def _get(self, i: int, immediate_mode: int) -> int:
+        return self._d[self._addr(i, immediate_mode)]
+
+    def _set(self, i: int, immediate_mode: int, value: int):
+        self._d[self._addr(i, immediate_mode)] = value
+
+    def _op_add(self):
+        self._set(3, self._m3, self._get(1, self._m1) + self._get(2, self._m2))
+        self._pc += 4
+
+    def _op_mul(self):
+        self._set(3, self._m3, self._get(1, self._m1) * self._get(2, self._m2))
+        self._pc += 4
+
+    def _op_in(self):
+        self._set(1, self._m1, self._inputs.pop(0))
+        self._pc += 2
+
+    def _op_out(self):
+        self._result = self._get(1, self._m1)
+        self._pc += 2
+
+    def _op_jit(self):
+        if self._get(1, self._m1) != 0:
+            self._pc = self._get(2, self._m2)
+        else:
+            self._pc += 3
+
+    def _op_jif(self):
+        if self._get(1, self._m1) == 0:
+            self._pc = self._get(2, self._m2)
+        else:
+            self._pc += 3
+
+    def _op_lt(self):
+        self._set(3, self._m3, self._get(1, self._m1) < self._get(2, self._m2))
+        self._pc += 4
+
+    def _op_eq(self):
+        self._set(3, self._m3, self._get(1, self._m1) == self._get(2, self._m2))
+        self._pc += 4
+
+    def _op_arb(self):
+        self._rb += self._get(1, self._m1)
+        self._pc += 2
+
+    def _op_eop(self):
+        self._eop = True
+
+    def run(self) -> int:
+        while not self._eop:
+            self._decode()
+            self._op_table[self._op]()
+
+        return self._result
+
+
+def timed(fn: Callable[[], int]) -> Tuple[int, float]:
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def report(name: str, result: int, elapsed: float, steps: int):
+    print(f"{name:<10} {result:>12} {elapsed:>9.3f}s {steps / elapsed:>14,.0f} ins/s")
+
+
+def load(path: str) -> List[int]:
+    with open(path, 'r') as f:
+        data = f.read()
+
+    return list(map(int, data.split(',')))
+
+
+def bench_boost(path: str):
+    program = load(path)
+
+    vm = Intcode(program, [2])
+    result, elapsed = timed(lambda: vm.run_to_end()[-1])
+    steps = vm.steps
+
+    compiled = CompiledIntcode(program, [2])
+    compiled_result, compiled_elapsed = timed(lambda: compiled.run_to_end()[-1])
+    assert compiled.steps == steps
+
+    paged = Intcode(program, [2], memory=PagedMemory)
+    paged_result, paged_elapsed = timed(lambda: paged.run_to_end()[-1])
+
+    legacy_result, legacy_elapsed = timed(LegacyIntcode(program, [2]).run)
+    assert legacy_result == result == compiled_result == paged_result
+
+    print(f"BOOST part 2: {steps:,} instructions")
+    report("legacy", legacy_result, legacy_elapsed, steps)
+    report("intcode", result, elapsed, steps)
+    report("compiled", compiled_result, compiled_elapsed, steps)
+    report("paged", paged_result, paged_elapsed, steps)
+    print(f"Memory: {vm.stats['bytes']:,} bytes list (with its int objects), "
+          f"{paged.stats['peak_bytes']:,} bytes paged ({paged.stats['pages']} pages)")
+    print(f"Speedup: {legacy_elapsed / elapsed:.2f}x interpreted, {legacy_elapsed / compiled_elapsed:.2f}x compiled")
+
+
+def bench_beam(path: str):
+    from .batch import run_batch
+
+    program = load(path)
+    probes = [[x, y] for x in range(50) for y in range(50)]
+
+    legacy_result, legacy_elapsed = timed(lambda: sum(LegacyIntcode(program, probe[:]).run() for probe in probes))
+    vm_result, vm_elapsed = timed(lambda: sum(Intcode(program, probe).run_to_end()[0] for probe in probes))
+    compiled_result, compiled_elapsed = timed(
+        lambda: sum(CompiledIntcode(program, probe).run_to_end()[0] for probe in probes))
+    batch_result, batch_elapsed = timed(lambda: sum(out[0] for out in run_batch(program, probes)))
+
+    assert legacy_result == vm_result == compiled_result == batch_result
+
+    steps = 0
+    for probe in probes:
+        m = Intcode(program, probe)
+        m.run()
+        steps += m.steps
+
+    print(f"Beam scan: {len(probes)} probes, {steps:,} instructions")
+    report("legacy", legacy_result, legacy_elapsed, steps)
+    report("intcode", vm_result, vm_elapsed, steps)
+    report("compiled", compiled_result, compiled_elapsed, steps)
+    report("batch", batch_result, batch_elapsed, steps)
+    print(f"Speedup: {legacy_elapsed / batch_elapsed:.2f}x batch, "
+          f"{compiled_elapsed / batch_elapsed:.2f}x over compiled")
+
+
+BENCHMARKS = {
+    "boost": (bench_boost, "day09/input"),
+    "beam": (bench_beam, "day19/input"),
+}
+
+
+if __name__ == '__main__':
+    names = [sys.argv[1]] if len(sys.argv) > 1 else list(BENCHMARKS)
+
+    for name in names:
+        fn, path = BENCHMARKS[name]
+        fn(sys.argv[2] if len(sys.argv) > 2 else path)
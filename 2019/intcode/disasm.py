@@ -0,0 +1,207 @@
+from typing import Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+from .vm import ARITY, decode
+
+
+MNEMONICS = {
+    1: "ADD",
+    2: "MUL",
+    3: "IN",
+    4: "OUT",
+    5: "JIT",
+    6: "JIF",
+    7: "LT",
+    8: "EQ",
+    9: "ARB",
+    99: "EOP",
+}
+
+
+def operand(mode: int, param: int) -> str:
+    if mode == 0:
+        return f"[{param}]"
+
+    if mode == 1:
+        return str(param)
+
+    return f"[rb{param:+d}]" if param else "[rb]"
+
+
+def instruction(d: Sequence[int], pc: int) -> str:
+    """Text of the instruction at `pc`, or a DATA word if it does not decode."""
+    def word(i: int) -> int:
+        return d[i] if i < len(d) else 0
+
+    try:
+        op, m1, m2, m3 = decode(word(pc), pc)
+    except Exception:
+        return f"DATA {word(pc)}"
+
+    params = [operand(m, word(pc + i)) for i, m in enumerate((m1, m2, m3)[:ARITY[op]], start=1)]
+
+    return " ".join([MNEMONICS[op]] + params)
+
+
+class Instruction(NamedTuple):
+    pc: int
+    op: int
+    modes: Tuple[int, ...]
+    params: Tuple[int, ...]
+
+    @property
+    def next(self) -> int:
+        return self.pc + len(self.params) + 1
+
+    @property
+    def operands(self) -> Tuple[Tuple[int, int], ...]:
+        return tuple(zip(self.modes, self.params))
+
+    def __str__(self) -> str:
+        return " ".join([MNEMONICS[self.op]] + [operand(m, p) for m, p in self.operands])
+
+
+class BasicBlock(NamedTuple):
+    start: int
+    instructions: List[Instruction]
+    # Successor blocks, None stands for an indirect jump
+    succs: List[Optional[int]]
+
+    @property
+    def end(self) -> int:
+        return self.instructions[-1].next
+
+
+def decode_at(d: Sequence[int], pc: int) -> Optional[Instruction]:
+    if not 0 <= pc < len(d):
+        return None
+
+    try:
+        op, m1, m2, m3 = decode(d[pc], pc)
+    except Exception:
+        return None
+
+    n = ARITY[op]
+    if pc + n >= len(d):
+        return None
+
+    return Instruction(pc, op, (m1, m2, m3)[:n], tuple(d[pc + 1:pc + 1 + n]))
+
+
+def constant(ins: Instruction) -> Optional[int]:
+    """Value stored by an ADD/MUL of two immediates (how programs push return addresses)."""
+    if ins.op not in (1, 2) or ins.modes[:2] != (1, 1):
+        return None
+
+    a, b = ins.params[:2]
+    return a + b if ins.op == 1 else a * b
+
+
+def explore(d: Sequence[int], entries: Iterable[int] = (0,)) -> Dict[int, Instruction]:
+    """
+    Recursive descent disassembly from `entries`.
+
+    Besides fall through and constant jump targets, every constant stored by
+    an ADD/MUL of immediates that decodes as an instruction is explored too:
+    that is how programs push the return address before calling a function
+    that returns through an indirect jump.
+    """
+    code: Dict[int, Instruction] = {}
+    pending = list(entries)
+
+    while pending:
+        pc = pending.pop()
+
+        while pc not in code:
+            ins = decode_at(d, pc)
+            if ins is None:
+                break
+
+            code[pc] = ins
+
+            value = constant(ins)
+            if value is not None and decode_at(d, value) is not None:
+                pending.append(value)
+
+            if ins.op == 99:
+                break
+
+            if ins.op in (5, 6):
+                (m1, cond), (m2, target) = ins.operands
+
+                if m2 == 1:
+                    pending.append(target)
+
+                # Constant condition, the jump is unconditional (or never taken)
+                if m1 == 1 and (cond != 0) == (ins.op == 5):
+                    break
+
+            pc = ins.next
+
+    return code
+
+
+def jump(ins: Instruction) -> Tuple[List[Optional[int]], bool]:
+    """Possible jump targets (None if indirect) and whether it can fall through."""
+    (m1, cond), (m2, target) = ins.operands
+
+    targets: List[Optional[int]] = [target if m2 == 1 else None]
+
+    if m1 != 1:
+        return targets, True
+
+    if (cond != 0) == (ins.op == 5):
+        return targets, False
+
+    return [], True
+
+
+def cfg(d: Sequence[int], entries: Iterable[int] = (0,)) -> Dict[int, BasicBlock]:
+    """Basic blocks of the code reachable from `entries`, by start address."""
+    entries = list(entries)
+    code = explore(d, entries)
+
+    leaders = set(entries)
+    for ins in code.values():
+        value = constant(ins)
+        if value is not None and value in code:
+            leaders.add(value)
+
+        if ins.op in (5, 6):
+            targets, _ = jump(ins)
+            leaders.update(t for t in targets if t is not None)
+            leaders.add(ins.next)
+
+    blocks: Dict[int, BasicBlock] = {}
+
+    for start in sorted(leaders & code.keys()):
+        instructions = []
+        succs: List[Optional[int]] = []
+        pc = start
+
+        while True:
+            ins = code[pc]
+            instructions.append(ins)
+
+            if ins.op == 99:
+                break
+
+            if ins.op in (5, 6):
+                targets, falls = jump(ins)
+                succs.extend(targets)
+
+                if falls and ins.next in code:
+                    succs.append(ins.next)
+
+                break
+
+            if ins.next in leaders or ins.next not in code:
+                if ins.next in code:
+                    succs.append(ins.next)
+
+                break
+
+            pc = ins.next
+
+        blocks[start] = BasicBlock(start, instructions, succs)
+
+    return blocks
@@ -0,0 +1,489 @@
+from collections import deque
+
+from typing import (Any, Callable, Dict, FrozenSet, Iterable, List, MutableSequence, NamedTuple, NoReturn, Optional,
+                    Set, Tuple)
+
+from .vm import ARITY, Intcode, decode
+
+
+# Block events, anything else returned by a block is an output value
+WAIT = object()
+YIELD = object()
+EOP = object()
+FALLBACK = object()
+
+# Most instructions compiled into a single function
+MAX_BLOCK = 64
+
+# Times code can be rewritten before a machine gives up on compiling
+MAX_RECOMPILES = 8
+
+
+class Block(NamedTuple):
+    fn: Callable
+    start: int
+    # Addresses whose values are baked into the code, as (start, words) runs
+    runs: Tuple[Tuple[int, List[int]], ...]
+    baked: FrozenSet[int]
+    opcodes: FrozenSet[int]
+    # Address of the instruction every line of the source comes from
+    lines: Tuple[int, ...]
+
+
+class _Program:
+    """
+    Compiled code of a program, shared by every machine running it.
+
+    Operands the program patches at run time are marked volatile so blocks
+    read them from memory instead of baking them, that keeps the blocks valid
+    for every machine.
+    """
+
+    def __init__(self):
+        self.blocks: Dict[int, List[Block]] = {}
+        self.volatile: Set[int] = set()
+
+    def mark_volatile(self, addr: int):
+        self.volatile.add(addr)
+
+        # Machines already running them keep their blocks until they write there
+        for start, candidates in self.blocks.items():
+            self.blocks[start] = [b for b in candidates if addr not in b.baked]
+
+
+# Compiled programs, keyed by the program itself
+_PROGRAMS: Dict[Tuple[int, ...], _Program] = {}
+
+
+def _grow(d: MutableSequence[int], i: int):
+    if len(d) <= i:
+        d.extend([0] * (i + 1 - len(d)))
+
+
+def _const(expr: str) -> bool:
+    return expr.lstrip('-').isdigit()
+
+
+def _runs(d: MutableSequence[int], addrs: Iterable[int]) -> Tuple[Tuple[int, List[int]], ...]:
+    runs: List[List[int]] = []
+
+    for a in sorted(addrs):
+        if runs and runs[-1][1] == a:
+            runs[-1][1] = a + 1
+        else:
+            runs.append([a, a + 1])
+
+    return tuple((s, list(d[s:e]) + [0] * (e - max(s, len(d)))) for s, e in runs)
+
+
+class _BlockWriter:
+    """Generates the Python source of the block starting at `start`."""
+
+    def __init__(self, start: int, volatile: Set[int]):
+        self.start = start
+        self.volatile = volatile
+        self.lines: List[str] = []
+        self.pcs: List[int] = []
+        self.at = start
+        self.indent = ""
+        self.loops = False
+        self.count = 0
+        self.addrs: Set[int] = set()
+        self.opcodes: Set[int] = set()
+        self.static_hi = start
+        self.rb_delta = 0
+        self.rel_hi: Optional[int] = None
+
+    def emit(self, line: str):
+        self.lines.append(f"{self.indent}{line}")
+        self.pcs.append(self.at)
+
+    def exit(self, pc: str, count: int, event: str = "None"):
+        self.emit(f"return {pc}, rb, n + {count}, {event}")
+
+    def param(self, param: int, at: int) -> str:
+        if at in self.volatile:
+            self.addrs.discard(at)
+            return f"d[{at}]"
+
+        return str(param)
+
+    def addr(self, mode: int, param: int, at: int) -> str:
+        p = self.param(param, at)
+
+        if mode == 1:
+            return str(at)
+
+        if mode == 0:
+            if _const(p):
+                self.static_hi = max(self.static_hi, param)
+            else:
+                self.emit(f"if {p} >= len(d):")
+                self.emit(f"    grow(d, {p})")
+
+            return p
+
+        if _const(p):
+            offset = self.rb_delta + param
+            self.rel_hi = offset if self.rel_hi is None else max(self.rel_hi, offset)
+            return f"rb + {param}" if param else "rb"
+
+        self.emit(f"if rb + {p} >= len(d):")
+        self.emit(f"    grow(d, rb + {p})")
+        return f"rb + {p}"
+
+    def value(self, mode: int, param: int, at: int) -> str:
+        if mode == 1:
+            return self.param(param, at)
+
+        return f"d[{self.addr(mode, param, at)}]"
+
+    def store(self, mode: int, param: int, at: int, expr: str, nxt: int, stops: bool = False):
+        target = self.addr(mode, param, at)
+
+        if not _const(target):
+            self.emit(f"a = {target}")
+            target = "a"
+
+        self.emit(f"d[{target}] = {expr}")
+        self.emit(f"if {target} in baked:")
+
+        if stops:
+            # The machine stops here anyway, just drop the overwritten block
+            self.emit(f"    inval({target}, {nxt}, rb, 0)")
+        else:
+            self.emit(f"    return inval({target}, {nxt}, rb, n + {self.count + 1})")
+
+    def _prologue(self) -> List[str]:
+        lines = ["def block(d, rb, inputs, empty_input, baked, inval):", "    n = 0"]
+
+        if self.loops:
+            lines.append("    while True:")
+
+        return lines
+
+    def _checks(self) -> List[str]:
+        checks = [f"if {self.static_hi} >= len(d):", f"    grow(d, {self.static_hi})"]
+
+        if self.rel_hi is not None:
+            hi = f"rb + {self.rel_hi}" if self.rel_hi else "rb"
+            checks += [f"if {hi} >= len(d):", f"    grow(d, {hi})"]
+
+        return checks
+
+    def source(self) -> str:
+        indent = "        " if self.loops else "    "
+        return "\n".join(self._prologue() + [f"{indent}{line}" for line in self._checks() + self.lines])
+
+    def line_pcs(self) -> Tuple[int, ...]:
+        """Instruction address of every line of the source."""
+        return (self.start,) * (len(self._prologue()) + len(self._checks())) + tuple(self.pcs)
+
+
+def translate(d: MutableSequence[int], start: int, volatile: Set[int]) -> _BlockWriter:
+    """
+    Translate the code at `start` into the Python source of a `block` function.
+
+    The block runs straight-line code, following unconditional jumps with a
+    constant target and leaving through side exits on taken conditional jumps.
+    Operands at `volatile` addresses are read from memory, everything else is
+    baked into the code.
+
+    The generated function takes the machine memory and relative base (plus
+    the I/O queue and invalidation hooks) and returns the next pc, the new
+    relative base, the number of instructions executed and an event (None, an
+    output value, WAIT, YIELD, EOP or FALLBACK).
+    """
+    def word(i: int) -> int:
+        return d[i] if i < len(d) else 0
+
+    pc = start
+    w = _BlockWriter(start, volatile)
+
+    while True:
+        try:
+            op, m1, m2, m3 = decode(word(pc), pc)
+        except Exception:
+            if pc == start:
+                raise
+
+            # Let the next block raise when (and if) execution gets there
+            w.exit(str(pc), w.count)
+            break
+
+        w.at = pc
+        p1, p2, p3 = word(pc + 1), word(pc + 2), word(pc + 3)
+        nxt = pc + ARITY[op] + 1
+        w.addrs.update(range(pc, nxt))
+        w.opcodes.add(pc)
+        w.static_hi = max(w.static_hi, nxt - 1)
+
+        if op == 99:
+            w.exit(str(pc), w.count, "EOP")
+            break
+
+        if op in (1, 2, 7, 8):
+            a, b = w.value(m1, p1, pc + 1), w.value(m2, p2, pc + 2)
+            expr = {
+                1: f"{a} + {b}",
+                2: f"{a} * {b}",
+                7: f"1 if {a} < {b} else 0",
+                8: f"1 if {a} == {b} else 0",
+            }[op]
+
+            if _const(a) and _const(b):
+                expr = str(eval(expr))
+
+            w.store(m3, p3, pc + 3, expr, nxt)
+
+        elif op == 3:
+            w.emit("if not inputs:")
+            w.indent = "    "
+            w.emit("if empty_input is None:")
+            w.emit(f"    return {pc}, rb, n + {w.count}, WAIT")
+            w.store(m1, p1, pc + 1, "empty_input", nxt, stops=True)
+            w.exit(str(nxt), w.count + 1, "YIELD")
+            w.indent = ""
+            w.store(m1, p1, pc + 1, "inputs.popleft()", nxt)
+
+        elif op == 4:
+            w.exit(str(nxt), w.count + 1, w.value(m1, p1, pc + 1))
+            break
+
+        elif op == 9:
+            delta = w.value(m1, p1, pc + 1)
+            w.emit(f"rb += {delta}")
+
+            if not _const(delta):
+                w.exit(str(nxt), w.count + 1)
+                break
+
+            w.rb_delta += int(delta)
+
+        else:
+            cond = w.value(m1, p1, pc + 1)
+            target = w.value(m2, p2, pc + 2)
+            count = w.count + 1
+
+            if _const(cond):
+                taken = (int(cond) != 0) == (op == 5)
+
+                if not taken:
+                    w.count += 1
+                    pc = nxt
+                    continue
+
+                if not _const(target):
+                    w.exit(target, count)
+                    break
+
+                if int(target) == start:
+                    w.loops = True
+                    w.emit(f"n += {count}")
+                    w.emit("continue")
+                    break
+
+                if int(target) in w.opcodes or count >= MAX_BLOCK:
+                    w.exit(target, count)
+                    break
+
+                # Unconditional jump, keep compiling at the target
+                w.count += 1
+                pc = int(target)
+                continue
+
+            w.emit(f"if {cond} {'!=' if op == 5 else '=='} 0:")
+            if _const(target) and int(target) == start:
+                w.loops = True
+                w.emit(f"    n += {count}")
+                w.emit("    continue")
+            else:
+                w.emit(f"    return {target}, rb, n + {count}, None")
+
+        w.count += 1
+        pc = nxt
+
+        if w.count >= MAX_BLOCK or pc in w.opcodes:
+            w.exit(str(pc), w.count)
+            break
+
+    return w
+
+
+def compile_block(d: MutableSequence[int], start: int, volatile: Set[int]) -> Block:
+    w = translate(d, start, volatile)
+
+    namespace: Dict[str, Any] = {"grow": _grow, "WAIT": WAIT, "YIELD": YIELD, "EOP": EOP}
+    exec(compile(w.source(), f"<intcode block {start}>", "exec"), namespace)
+
+    return Block(namespace["block"], start, _runs(d, w.addrs), frozenset(w.addrs), frozenset(w.opcodes), w.line_pcs())
+
+
+class CompiledIntcode(Intcode):
+    """
+    Intcode machine that runs compiled blocks instead of interpreting.
+
+    Blocks are compiled on first use and cached per program, a machine adopts
+    a cached block when the code it was compiled from matches its memory. A
+    write into the baked code of a block drops it so it gets recompiled, if
+    the program keeps rewriting its instructions the machine falls back to the
+    interpreter for good.
+    """
+
+    def __init__(self, program: List[int],
+                 input_values: Optional[Iterable[int]] = None,
+                 empty_input: Optional[int] = None,
+                 memory: Optional[Callable[[List[int]], MutableSequence[int]]] = None):
+        super().__init__(program, input_values, empty_input, memory)
+
+        key = tuple(program)
+        if key not in _PROGRAMS:
+            _PROGRAMS[key] = _Program()
+
+        self._program = _PROGRAMS[key]
+        self._blocks: Dict[int, Callable] = {}
+        self._adopted: Dict[int, Block] = {}
+        self._baked: Set[int] = set()
+
+        self._recompiles = 0
+        # Profiling counts and tracing records interpreted instructions
+        self._fallback = self._hook is not None
+
+    def __setitem__(self, i: int, value: int):
+        super().__setitem__(i, value)
+
+        if i in self._baked:
+            self._invalidate(i, self._pc, self._rb, 0)
+
+    def fork(self) -> 'CompiledIntcode':
+        clone = super().fork()
+
+        clone._blocks = dict(self._blocks)
+        clone._adopted = dict(self._adopted)
+        clone._baked = set(self._baked)
+
+        return clone
+
+    def _compile(self, pc: int) -> Callable:
+        d = self._d
+        program = self._program
+        candidates = program.blocks.setdefault(pc, [])
+
+        for block in candidates:
+            if all(d[s:s + len(words)] == words for s, words in block.runs):
+                break
+
+        else:
+            block = compile_block(d, pc, program.volatile)
+            candidates.append(block)
+
+        self._blocks[pc] = block.fn
+        self._adopted[pc] = block
+        self._baked |= block.baked
+
+        return block.fn
+
+    def _invalidate(self, addr: int, pc: int, rb: int, n: int):
+        event = None
+
+        for start, block in list(self._adopted.items()):
+            if addr not in block.baked:
+                continue
+
+            del self._blocks[start]
+            del self._adopted[start]
+
+            if addr in block.opcodes:
+                self._recompiles += 1
+            else:
+                # Patched operand, read it from memory from now on
+                self._program.mark_volatile(addr)
+
+        self._baked.clear()
+        for block in self._adopted.values():
+            self._baked |= block.baked
+
+        if self._recompiles > MAX_RECOMPILES:
+            self._fallback = True
+            event = FALLBACK
+
+        return pc, rb, n, event
+
+    def _raise_fault(self, block: Block, error: IndexError) -> NoReturn:
+        """
+        Raise what the interpreter does for the instruction a block faulted
+        on. Blocks grow memory ahead, so only negative addresses get here.
+        """
+        tb = error.__traceback__
+        while tb is not None and tb.tb_next is not None:
+            tb = tb.tb_next
+
+        if tb is not None and tb.tb_frame.f_code.co_name == "block":
+            self._fault(block.lines[tb.tb_lineno - 1], tb.tb_frame.f_locals["rb"])
+
+        raise error
+
+    def run(self, input_values: Optional[Iterable[int]] = None) -> Optional[int]:
+        if self._fallback:
+            return super().run(input_values)
+
+        if self._eop:
+            raise Exception("[EOP] Machine already in End Of Program state.")
+
+        if input_values is not None:
+            self._inputs = deque(input_values)
+
+        d = self._d
+        inputs = self._inputs
+        empty_input = self._empty_input
+        blocks = self._blocks
+        baked = self._baked
+        inval = self._invalidate
+        collect = self._collect
+
+        pc = self._pc
+        rb = self._rb
+        steps = self._steps
+
+        output = None
+        self._waiting = False
+
+        while True:
+            fn = blocks.get(pc)
+            if fn is None:
+                fn = self._compile(pc)
+
+            try:
+                pc, rb, n, ev = fn(d, rb, inputs, empty_input, baked, inval)
+            except IndexError as e:
+                self._raise_fault(self._adopted[pc], e)
+
+            steps += n
+
+            if ev is None:
+                continue
+
+            if ev is WAIT:
+                self._waiting = True
+
+            elif ev is EOP:
+                self._eop = True
+
+            elif ev is FALLBACK:
+                self._pc, self._rb, self._steps = pc, rb, steps
+                return super().run()
+
+            elif ev is not YIELD:
+                if collect is not None:
+                    collect.append(ev)
+                    continue
+
+                output = ev
+
+            break
+
+        self._pc = pc
+        self._rb = rb
+        self._steps = steps
+
+        return output
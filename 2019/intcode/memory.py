@@ -0,0 +1,140 @@
+import sys
+
+from array import array
+
+from typing import Dict, Iterable, Iterator, List, MutableSequence, Tuple, Union, overload
+
+
+# Words per page
+PAGE_BITS = 10
+PAGE_SIZE = 1 << PAGE_BITS
+PAGE_MASK = PAGE_SIZE - 1
+PAGE_BYTES = PAGE_SIZE * array('q').itemsize
+ZERO_PAGE = bytes(PAGE_BYTES)
+
+
+class PagedMemory(MutableSequence[int]):
+    """
+    Sparse Intcode memory made of int64 pages allocated on first write.
+
+    The whole (non negative) address space is mapped: reading an untouched
+    address yields 0 and `len()` is the size of the address space, so the
+    VM never has to grow it. Iterating stops at the end of the last page
+    allocated (gaps included), compare memories by `snapshot_key()`
+    instead. Copies share their pages until one of them writes to a page,
+    then only that page is copied. Words can't be inserted nor deleted.
+
+    Values must fit in 64 bits, writing a bigger one raises OverflowError.
+    """
+
+    def __init__(self, program: Iterable[int] = ()):
+        # Every page, and the ones this memory can write without copying
+        self._pages: Dict[int, array] = {}
+        self._owned: Dict[int, array] = {}
+        self._peak = 0
+
+        words = list(program)
+        for start in range(0, len(words), PAGE_SIZE):
+            page = array('q', words[start:start + PAGE_SIZE])
+            page.frombytes(bytes(PAGE_BYTES - len(page) * page.itemsize))
+            self._pages[start >> PAGE_BITS] = self._owned[start >> PAGE_BITS] = page
+
+        self._peak = len(self._pages)
+
+    def __len__(self) -> int:
+        return sys.maxsize
+
+    @overload
+    def __getitem__(self, i: int) -> int: ...
+
+    @overload
+    def __getitem__(self, i: slice) -> List[int]: ...
+
+    def __getitem__(self, i: Union[int, slice]) -> Union[int, List[int]]:
+        try:
+            page = self._pages.get(i >> PAGE_BITS)  # type: ignore
+        except TypeError:
+            return [self[j] for j in range(*i.indices(sys.maxsize))]  # type: ignore
+
+        if page is None:
+            if i < 0:  # type: ignore
+                raise IndexError(f"Invalid address {i}")
+
+            return 0
+
+        return page[i & PAGE_MASK]  # type: ignore
+
+    @overload
+    def __setitem__(self, i: int, value: int): ...
+
+    @overload
+    def __setitem__(self, i: slice, value: Iterable[int]): ...
+
+    def __setitem__(self, i, value):
+        try:
+            page = self._owned.get(i >> PAGE_BITS)
+        except TypeError:
+            # Slices write in place, they can't change the size of the address space
+            addrs = range(*i.indices(sys.maxsize))
+            values = list(value)
+            if len(values) != len(addrs):
+                raise ValueError(f"Can't assign {len(values)} words to {len(addrs)} addresses")
+
+            for j, v in zip(addrs, values):
+                self[j] = v
+
+            return
+
+        if page is None:
+            page = self._own(i)
+
+        page[i & PAGE_MASK] = value
+
+    def __delitem__(self, i):
+        raise TypeError("PagedMemory words can't be deleted")
+
+    def insert(self, i: int, value: int):
+        raise TypeError("PagedMemory words can't be inserted")
+
+    def __iter__(self) -> Iterator[int]:
+        empty = array('q', bytes(PAGE_BYTES))
+
+        for n in range(max(self._pages, default=-1) + 1):
+            yield from self._pages.get(n, empty)
+
+    def snapshot_key(self) -> Tuple[Tuple[int, bytes], ...]:
+        """Hashable contents, equal for memories holding the same words wherever their pages are."""
+        pages = ((n, page.tobytes()) for n, page in sorted(self._pages.items()))
+        return tuple((n, words) for n, words in pages if words != ZERO_PAGE)
+
+    def _own(self, i: int) -> array:
+        if i < 0:
+            raise IndexError(f"Invalid address {i}")
+
+        n = i >> PAGE_BITS
+        shared = self._pages.get(n)
+
+        page = array('q', shared) if shared is not None else array('q', bytes(PAGE_BYTES))
+        self._pages[n] = self._owned[n] = page
+        self._peak = max(self._peak, len(self._pages))
+
+        return page
+
+    def __copy__(self) -> 'PagedMemory':
+        clone = PagedMemory()
+
+        clone._pages = dict(self._pages)
+        clone._peak = self._peak
+
+        # Pages are shared from now on, both sides copy them before writing
+        self._owned = {}
+
+        return clone
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        return {
+            "pages": len(self._pages),
+            "bytes": len(self._pages) * PAGE_BYTES,
+            "peak_bytes": self._peak * PAGE_BYTES,
+        }
@@ -0,0 +1,122 @@
+"""
+Opt-in Intcode profiler.
+
+Set INTCODE_PROFILE to profile every machine a day creates, a report per
+program is printed to stderr at exit:
+
+  INTCODE_PROFILE=1 python3 day09/boost.py day09/input
+
+Profiled machines always interpret (CompiledIntcode included) and count
+every instruction they complete, taking about 3.5 times as long. Runs
+that end blocked on input or polling it with `empty_input` count as input
+waits. Machines run in worker processes (day 07 pool) are not reported.
+"""
+import atexit
+import sys
+import time
+
+from collections import Counter
+
+from typing import Dict, List, Tuple
+
+from .disasm import MNEMONICS, instruction
+
+
+class Profile:
+    """Counters shared by every profiled machine running the same program."""
+
+    def __init__(self, program: List[int]):
+        self.program = program[:]
+        self.machines = 0
+        self.pcs: Counter = Counter()
+        self.opcodes: Counter = Counter()
+        self.runs = 0
+        self.waits = 0
+        self.elapsed = 0.0
+
+    def record(self, waited: bool, elapsed: float):
+        self.runs += 1
+        self.waits += waited
+        self.elapsed += elapsed
+
+    def report(self, top: int = 15) -> str:
+        total = sum(self.pcs.values())
+        pct = (lambda n: 100 * n / total) if total else (lambda n: 0.0)
+        rate = total / self.elapsed if self.elapsed else 0.0
+
+        lines = [
+            f"Intcode profile: {self.machines} machines, {total:,} instructions in {self.elapsed:.3f}s "
+            f"({rate:,.0f} ins/s), {self.runs:,} runs, {self.waits:,} input waits",
+            "Opcodes:",
+        ]
+
+        for op, hits in self.opcodes.most_common():
+            lines.append(f"  {MNEMONICS[op]:<4} {hits:>12,} {pct(hits):6.2f}%")
+
+        lines.append("Hot PCs:")
+        lines.append(f"  {'pc':>6} {'hits':>12} {'%':>7}  instruction")
+
+        for pc, hits in self.pcs.most_common(top):
+            lines.append(f"  {pc:>6} {hits:>12,} {pct(hits):6.2f}%  {instruction(self.program, pc)}")
+
+        return "\n".join(lines)
+
+
+class Profiler:
+    """Hook of one machine, counting the instructions it completes into the profile of its program."""
+
+    def __init__(self, profile: Profile, m):
+        self.profile = profile
+        profile.machines += 1
+
+        self.pc = m._pc
+        self.op = 0
+        self.begin = 0.0
+
+    def start(self, m):
+        self.pc = m._pc
+        self.op = 0
+        self.begin = time.perf_counter()
+
+    def step(self, op: int, x: int, y: int, pc: int, rb: int):
+        self.op = op
+
+        if op != 99:
+            self.profile.pcs[self.pc] += 1
+            self.profile.opcodes[op] += 1
+
+        self.pc = pc
+
+    def stop(self, m):
+        # A run only ends right after an input when it read `empty_input`
+        self.profile.record(m._waiting or self.op == 3, time.perf_counter() - self.begin)
+
+    def poke(self, addr: int, value: int):
+        pass
+
+    def fork(self, clone) -> 'Profiler':
+        # Forks keep counting into the same profile
+        return Profiler(self.profile, clone)
+
+
+_PROFILES: Dict[Tuple[int, ...], Profile] = {}
+
+
+def attach(machine, program: List[int]) -> Profile:
+    """Start profiling `machine`, which was just created from `program`."""
+    if not _PROFILES:
+        atexit.register(print_reports)
+
+    key = tuple(program)
+    if key not in _PROFILES:
+        _PROFILES[key] = Profile(program)
+
+    profile = _PROFILES[key]
+    machine._hook = Profiler(profile, machine)
+
+    return profile
+
+
+def print_reports():
+    for profile in _PROFILES.values():
+        print(profile.report(), file=sys.stderr)
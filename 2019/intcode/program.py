@@ -0,0 +1,17 @@
+import os
+import sys
+
+from typing import List
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+
+from aoc.cache import cached  # noqa: E402
+
+
+def parse(text: str) -> List[int]:
+    return list(map(int, text.split(',')))
+
+
+def load(path: str) -> List[int]:
+    """Intcode program in the file, through the parse cache."""
+    return cached(path, parse)
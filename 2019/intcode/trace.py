@@ -0,0 +1,396 @@
+#!/usr/bin/env python3
+"""
+Opt-in Intcode execution traces.
+
+Set INTCODE_TRACE to a file name to record every instruction run by every
+machine a day creates:
+
+  INTCODE_TRACE=/tmp/cat6.trace python3 day23/cat6.py day23/input
+
+The trace is a memory-mapped file of fixed width records: machine, pc,
+opcode and the values the instruction read and wrote (inputs and outputs
+included), plus writes done from outside the machine. Next to it, the
+`.snap` file keeps the state of each machine when it is created (forks
+included) and every INTCODE_TRACE_EVERY steps (100,000 by default), so a
+replay can seek to any step from the last snapshot before it:
+
+  python3 -m intcode.trace /tmp/cat6.trace [--machine N] [--step S] [--count C] [--state]
+
+Traced machines always interpret (CompiledIntcode included) and take about
+twice as long as the plain interpreter. Values must fit in 64 bits.
+Machines run in worker processes (day 07 pool) are not traced.
+"""
+import argparse
+import atexit
+import copy
+import mmap
+import multiprocessing
+import os
+import pickle
+import struct
+import sys
+
+from itertools import chain
+
+from typing import Dict, Iterator, List, MutableSequence, NamedTuple, Optional, Sequence, Tuple
+
+from .disasm import MNEMONICS, instruction
+from .vm import Intcode, decode
+
+
+MAGIC = b'ICTRACE1'
+
+# Magic, number of records, snapshot interval
+HEADER = struct.Struct('<8sQQ')
+
+# pc, opcode and up to two values:
+#   ADD MUL LT EQ  operands (the result follows from them)
+#   IN             value read
+#   OUT            value written
+#   JIT JIF        condition and target
+#   ARB            offset
+#   POKE           value written to the address in pc by the machine owner
+#   MACHINE        machine the records up to the next MACHINE are from
+RECORD = struct.Struct('<IBxxxqq')
+
+POKE = 100
+MACHINE = 101
+
+# Records the file starts with, it doubles every time it fills up
+CHUNK = 1 << 16
+
+# Most records a machine queues before packing them into the file
+BLOCK = 4096
+
+
+class Record(NamedTuple):
+    machine: int
+    pc: int
+    op: int
+    x: int
+    y: int
+
+
+class Snapshot(NamedTuple):
+    machine: int
+    step: int
+    # Records in the trace when it was taken
+    record: int
+    pc: int
+    rb: int
+    memory: MutableSequence[int]
+
+
+class Trace:
+    """Trace file shared by every machine of the process."""
+
+    def __init__(self, path: str, every: int):
+        self.path = path
+        self.every = every
+        self.machines = 0
+
+        self._file = open(path, 'w+b')
+        self._file.truncate(HEADER.size + CHUNK * RECORD.size)
+        self.buf = mmap.mmap(self._file.fileno(), 0)
+        self.offset = HEADER.size
+
+        # Struct packing a block of n records, by n
+        self._blocks: Dict[int, struct.Struct] = {}
+
+        self._snapshots = open(path + '.snap', 'wb')
+        self.sync()
+
+    @property
+    def records(self) -> int:
+        return (self.offset - HEADER.size) // RECORD.size
+
+    def sync(self):
+        HEADER.pack_into(self.buf, 0, MAGIC, self.records, self.every)
+
+    def grow(self):
+        self.buf.resize(2 * len(self.buf))
+
+    def flush(self, machine: int, fields: List[int]):
+        """Pack the records of a machine, given as a flat list of their fields."""
+        n = len(fields) // (len(Record._fields) - 1)
+        if not n:
+            return
+
+        fields[:0] = (0, MACHINE, machine, 0)
+        n += 1
+
+        while self.offset + n * RECORD.size > len(self.buf):
+            self.grow()
+
+        block = self._blocks.get(n)
+        if block is None:
+            block = self._blocks[n] = struct.Struct('<' + RECORD.format[1:] * n)
+
+        block.pack_into(self.buf, self.offset, *fields)
+        self.offset += n * RECORD.size
+        self.sync()
+
+    def snapshot(self, machine: int, step: int, pc: int, rb: int, memory: MutableSequence[int]):
+        snap = Snapshot(machine, step, self.records, pc, rb, copy.copy(memory))
+        pickle.dump(snap, self._snapshots)
+        self._snapshots.flush()
+
+    def close(self):
+        if self.buf.closed:
+            return
+
+        self.sync()
+        self.buf.close()
+        self._file.truncate(self.offset)
+        self._file.close()
+        self._snapshots.close()
+
+
+class Recorder:
+    """Records one machine into the trace, as the hook of its interpreter."""
+
+    def __init__(self, trace: Trace, m: Intcode):
+        self.trace = trace
+        self.id = trace.machines
+        trace.machines += 1
+
+        # Records are packed into the file in blocks, the step count tells
+        # when to flush them (and when to take the next snapshot)
+        self.pending: List[int] = []
+        self.m = m
+        self.steps = m._steps
+
+        self.snapshot(m._pc, m._rb)
+
+    def snapshot(self, pc: int, rb: int):
+        self.trace.snapshot(self.id, self.steps, pc, rb, self.m._d)
+        self.next_snapshot = self.steps + self.trace.every
+        self.flush_at = min(self.steps + BLOCK, self.next_snapshot)
+
+    def fork(self, clone: Intcode) -> 'Recorder':
+        return Recorder(self.trace, clone)
+
+    def poke(self, addr: int, value: int):
+        self.trace.flush(self.id, [addr, POKE, value, 0])
+
+    def start(self, m: Intcode):
+        self.m = m
+        self.pc = m._pc
+        self.steps = m._steps
+
+    def step(self, op: int, x: int, y: int, pc: int, rb: int):
+        self.pending.extend((self.pc, op, x, y))
+        self.pc = pc
+
+        if op == 99:
+            return
+
+        self.steps += 1
+        if self.steps < self.flush_at:
+            return
+
+        self.trace.flush(self.id, self.pending)
+        self.pending.clear()
+
+        if self.steps >= self.next_snapshot:
+            self.snapshot(pc, rb)
+        else:
+            self.flush_at = min(self.steps + BLOCK, self.next_snapshot)
+
+    def stop(self, m: Intcode):
+        self.trace.flush(self.id, self.pending)
+        self.pending.clear()
+
+
+_TRACE: Optional[Trace] = None
+
+# Set while a replay creates its machines, so they are not recorded
+_REPLAYING = False
+
+
+def attach(m: Intcode):
+    """Start recording `m`, which was just created."""
+    global _TRACE
+
+    if _REPLAYING or multiprocessing.current_process().name != "MainProcess":
+        return
+
+    if _TRACE is None:
+        _TRACE = Trace(os.environ["INTCODE_TRACE"], int(os.environ.get("INTCODE_TRACE_EVERY", 100000)))
+        atexit.register(_TRACE.close)
+
+    m._hook = Recorder(_TRACE, m)
+
+
+class Replay:
+    """Read side of a trace and its snapshots."""
+
+    def __init__(self, path: str):
+        with open(path, 'rb') as f:
+            self.buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, self.records, self.every = HEADER.unpack_from(self.buf, 0)
+        if magic != MAGIC:
+            raise Exception(f"{path} is not an Intcode trace")
+
+        self.snapshots: List[Snapshot] = []
+        with open(path + '.snap', 'rb') as f:
+            while True:
+                try:
+                    self.snapshots.append(pickle.load(f))
+                except EOFError:
+                    break
+
+    @property
+    def machines(self) -> int:
+        return max((s.machine for s in self.snapshots), default=-1) + 1
+
+    def __len__(self) -> int:
+        return self.records
+
+    def scan(self, start: int = 0, machine: Optional[int] = None) -> Iterator[Tuple[int, Record]]:
+        """
+        (index, record) from record `start` on, only the ones of `machine` if
+        given. Snapshots are taken between blocks, so any snapshot record is
+        a valid start.
+        """
+        view = memoryview(self.buf)[HEADER.size + start * RECORD.size:HEADER.size + self.records * RECORD.size]
+        current = -1
+
+        try:
+            for i, (pc, op, x, y) in enumerate(RECORD.iter_unpack(view), start=start):
+                if op == MACHINE:
+                    current = x
+
+                elif machine is None or current == machine:
+                    yield i, Record(current, pc, op, x, y)
+        finally:
+            view.release()
+
+    def first_step(self, machine: int) -> int:
+        """Step count of the machine when it was created, forks go on from their parent."""
+        steps = [s.step for s in self.snapshots if s.machine == machine]
+        if not steps:
+            raise Exception(f"No machine {machine} in the trace")
+
+        return min(steps)
+
+    def seek(self, machine: int, step: int) -> Tuple[Intcode, Iterator[Tuple[int, Record]]]:
+        """
+        State of `machine` before running its instruction number `step`, and
+        its records from there on. Starts from the last snapshot before the
+        step and applies the records of the machine up to it.
+        """
+        snaps = [s for s in self.snapshots if s.machine == machine and s.step <= step]
+        if not snaps:
+            raise Exception(f"No snapshot of machine {machine} before step {step}")
+
+        snap = max(snaps, key=lambda s: (s.step, s.record))
+
+        global _REPLAYING
+        _REPLAYING = True
+        try:
+            m = Intcode([], memory=lambda _: copy.copy(snap.memory))
+        finally:
+            _REPLAYING = False
+
+        m._pc, m._rb, m._steps = snap.pc, snap.rb, snap.step
+
+        records = self.scan(snap.record, machine)
+        for i, record in records:
+            if m._steps >= step or m._eop:
+                return m, chain([(i, record)], records)
+
+            apply(m, record)
+
+        return m, iter(())
+
+    def state(self, machine: int, step: int) -> Intcode:
+        """Machine as it was before running its instruction number `step`."""
+        return self.seek(machine, step)[0]
+
+
+def apply(m: Intcode, record: Record):
+    """Replay a record on the machine it was taken from."""
+    if record.op == POKE:
+        m[record.pc] = record.x
+        return
+
+    pc = m._pc
+    if record.pc != pc:
+        raise Exception(f"[PC:{pc}] Trace out of sync, record at pc {record.pc}")
+
+    op, m1, m2, m3 = decode(m[pc], pc)
+
+    def addr(i: int, mode: int) -> int:
+        return m[pc + i] if mode == 0 else pc + i if mode == 1 else m._rb + m[pc + i]
+
+    if op == 99:
+        m._eop = True
+        return
+
+    if op in (1, 2, 7, 8):
+        x, y = record.x, record.y
+        m[addr(3, m3)] = x + y if op == 1 else x * y if op == 2 else int(x < y if op == 7 else x == y)
+        m._pc = pc + 4
+
+    elif op == 3:
+        m[addr(1, m1)] = record.x
+        m._pc = pc + 2
+
+    elif op == 4:
+        m._pc = pc + 2
+
+    elif op in (5, 6):
+        m._pc = record.y if (record.x != 0) == (op == 5) else pc + 3
+
+    else:
+        m._rb += record.x
+        m._pc = pc + 2
+
+    m._steps += 1
+
+
+def print_records(replay: Replay, machine: int, step: int, count: int):
+    m, records = replay.seek(machine, step)
+
+    print(f"{'step':>10} {'pc':>6}  {'op':<4} values")
+
+    for _, record in records:
+        if count == 0:
+            break
+
+        name = "POKE" if record.op == POKE else MNEMONICS[record.op]
+        label = "" if record.op == POKE else f"{m._steps:>10}"
+        code = f"[{record.pc}]" if record.op == POKE else instruction(m._d, record.pc)
+
+        print(f"{label:>10} {record.pc:>6}  {name:<4} {record.x} {record.y}  ({code})")
+
+        apply(m, record)
+        count -= 1
+
+
+def main(argv: Optional[Sequence[str]] = None):
+    parser = argparse.ArgumentParser(description="Replay an Intcode trace")
+    parser.add_argument("trace", help="trace file (INTCODE_TRACE)")
+    parser.add_argument("--machine", type=int, default=0, help="machine to replay")
+    parser.add_argument("--step", type=int, help="first step to show (default: the first one)")
+    parser.add_argument("--count", type=int, default=20, help="records to show")
+    parser.add_argument("--state", action="store_true", help="print the machine state at the step instead")
+    args = parser.parse_args(argv)
+
+    replay = Replay(args.trace)
+    step = args.step if args.step is not None else replay.first_step(args.machine)
+    print(f"{len(replay):,} records, {replay.machines} machines, {len(replay.snapshots)} snapshots "
+          f"(every {replay.every:,} steps)")
+
+    if args.state:
+        m = replay.state(args.machine, step)
+        print(f"machine {args.machine} step {m._steps}: pc {m._pc}, rb {m._rb}"
+              f"{', ended' if m.eop else ''}, next {instruction(m._d, m._pc)}")
+    else:
+        print_records(replay, args.machine, step, args.count)
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,433 @@
+import copy
+import os
+import sys
+
+from collections import deque
+
+from typing import (Callable, Deque, Dict, Hashable, Iterable, Iterator, List, MutableSequence, Optional, Protocol,
+                    Tuple, TypeVar)
+
+
+# Number of parameters for every opcode
+ARITY = {
+    1: 3,   # ADD
+    2: 3,   # MUL
+    3: 1,   # IN
+    4: 1,   # OUT
+    5: 2,   # JIT
+    6: 2,   # JIF
+    7: 3,   # LT
+    8: 3,   # EQ
+    9: 1,   # ARB
+    99: 0,  # EOP
+}
+
+# (op, m1, m2, m3)
+Decoded = Tuple[int, int, int, int]
+
+# Machine type forks and snapshots keep (CompiledIntcode included)
+M = TypeVar("M", bound="Intcode")
+
+# Profile every machine, see profile.py
+PROFILE = bool(os.environ.get("INTCODE_PROFILE"))
+
+# Record every machine, see trace.py
+TRACE = bool(os.environ.get("INTCODE_TRACE"))
+
+if PROFILE and TRACE:
+    raise Exception("INTCODE_PROFILE and INTCODE_TRACE both hook the interpreter, set only one")
+
+
+class Hook(Protocol):
+    """
+    Observer of a machine, set as its `_hook`. The interpreter calls step()
+    after every instruction it completes with its opcode, the values it read
+    (x and y, 0 when unused) and where the machine went on to (pc and rb),
+    so the instruction was at the pc of the step before (or the one of the
+    machine at start()). Faulting instructions are only seen once retried.
+    """
+
+    def start(self, m: 'Intcode'): ...
+
+    def step(self, op: int, x: int, y: int, pc: int, rb: int): ...
+
+    def stop(self, m: 'Intcode'): ...
+
+    def poke(self, addr: int, value: int): ...
+
+    def fork(self, clone: 'Intcode') -> 'Hook': ...
+
+
+def decode(instruction: int, pc: int = -1) -> Decoded:
+    op = instruction % 100
+
+    if op not in ARITY:
+        raise Exception(f"[PC:{pc}] Invalid operation '{op}'")
+
+    m1 = instruction // 100 % 10
+    m2 = instruction // 1000 % 10
+    m3 = instruction // 10000 % 10
+
+    for m in (m1, m2, m3)[:ARITY[op]]:
+        if m > 2:
+            raise Exception(f"[PC:{pc}] Invalid mode '{m}'")
+
+    return op, m1, m2, m3
+
+
+class Intcode:
+    """
+    Intcode machine shared by every 2019 day.
+
+    Each instruction word is decoded once and the result is cached by
+    address, a write to a decoded address drops its cache entry so
+    self-modifying programs keep working.
+
+    `run()` stops on every output (returning it), on end of program and
+    when an input instruction finds the input queue empty (returning
+    None in both cases). If `empty_input` is set, reading from an empty
+    queue yields that value instead of blocking and the machine stops
+    right after reading it.
+
+    Memory is a plain list grown on demand unless a `memory` factory (like
+    `PagedMemory`) is given, it gets called with the program.
+    """
+
+    def __init__(self, program: List[int],
+                 input_values: Optional[Iterable[int]] = None,
+                 empty_input: Optional[int] = None,
+                 memory: Optional[Callable[[List[int]], MutableSequence[int]]] = None):
+        self._d = memory(program) if memory else program[:]
+
+        self._inputs: Deque[int] = deque(input_values if input_values else [])
+        self._empty_input = empty_input
+
+        self._eop = False
+        self._waiting = False
+        self._pc = 0
+        self._rb = 0
+        self._steps = 0
+
+        self._decoded: Dict[int, Decoded] = {}
+
+        # Outputs are appended here instead of stopping when set, see run_to_end()
+        self._collect: Optional[List[int]] = None
+
+        self._hook: Optional[Hook] = None
+        if PROFILE:
+            from .profile import attach
+            attach(self, program)
+
+        if TRACE:
+            from .trace import attach as attach_trace
+            attach_trace(self)
+
+    # State
+    @property
+    def eop(self) -> bool:
+        return self._eop
+
+    @property
+    def waiting(self) -> bool:
+        return self._waiting
+
+    @property
+    def steps(self) -> int:
+        return self._steps
+
+    def state(self) -> Tuple[int, int, Hashable]:
+        """
+        pc, relative base and memory contents, machines in equal states run
+        the same from there given the same input (a machine polling with
+        `empty_input` into the same state again is spinning).
+        """
+        # Sparse memories (PagedMemory) only give the pages they hold
+        snapshot_key = getattr(self._d, "snapshot_key", None)
+        memory = snapshot_key() if snapshot_key is not None else tuple(self._d)
+
+        return self._pc, self._rb, memory
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        stats = {"steps": self._steps}
+
+        memory_stats = getattr(self._d, "stats", None)
+        if memory_stats is not None:
+            stats.update(memory_stats)
+        else:
+            # The list holds pointers, count the int objects too (shared ones once)
+            ints = {id(v): v for v in self._d}
+            stats["words"] = len(self._d)
+            stats["bytes"] = sys.getsizeof(self._d) + sum(sys.getsizeof(v) for v in ints.values())
+
+        return stats
+
+    # Memory access functions
+    def __getitem__(self, i: int) -> int:
+        return self._d[i] if i < len(self._d) else 0
+
+    def __setitem__(self, i: int, value: int):
+        try:
+            self._d[i] = value
+        except IndexError:
+            self._check_mem_size(i)
+            self._d[i] = value
+
+        self._decoded.pop(i, None)
+
+        if self._hook is not None:
+            self._hook.poke(i, value)
+
+    def _check_mem_size(self, i: int):
+        if len(self._d) <= i:
+            self._d.extend([0] * (i + 1 - len(self._d)))
+
+    def _fault(self, pc: int, rb: int):
+        """Grow memory so every address used by the instruction at pc exists."""
+        d = self._d
+
+        if pc >= len(d):
+            self._check_mem_size(pc)
+            return
+
+        op, m1, m2, m3 = decode(d[pc], pc)
+        addrs = [pc + ARITY[op]]
+
+        for i, m in enumerate((m1, m2, m3)[:ARITY[op]], start=1):
+            param = d[pc + i] if pc + i < len(d) else 0
+
+            if m == 0:
+                addrs.append(param)
+
+            elif m == 2:
+                addrs.append(rb + param)
+
+        if max(addrs) < len(d) or min(addrs) < 0:
+            raise Exception(f"[PC:{pc}] Invalid memory access {addrs}")
+
+        self._check_mem_size(max(addrs))
+
+    # Snapshot functions
+    def fork(self: M) -> M:
+        """Independent copy of the machine, memory included."""
+        clone = copy.copy(self)
+
+        clone._d = copy.copy(self._d)
+        clone._inputs = deque(self._inputs)
+        clone._decoded = copy.copy(self._decoded)
+
+        if self._hook is not None:
+            clone._hook = self._hook.fork(clone)
+
+        return clone
+
+    def snapshot(self: M) -> M:
+        """Frozen copy of the current state, to be passed to `restore()`."""
+        return self.fork()
+
+    def restore(self: M, snapshot: M):
+        self.__dict__.update(snapshot.fork().__dict__)
+
+    # I/O functions
+    def feed(self, values: Iterable[int]):
+        self._inputs.extend(values)
+
+    # ASCII I/O functions
+    def write(self, *lines: str):
+        """Queue every line as ASCII input, each one ended by a newline."""
+        for line in lines:
+            self._inputs.extend(line.encode('ascii'))
+            self._inputs.append(10)
+
+    def read(self) -> str:
+        """
+        Run until end of program (or blocked on input) and return the output
+        as text. Values out of the ASCII range are left out, use run_to_end()
+        when they matter.
+        """
+        return bytes(o for o in self.run_to_end() if 0 <= o < 128).decode('ascii')
+
+    # Exec functions
+    def run(self, input_values: Optional[Iterable[int]] = None) -> Optional[int]:
+        if self._eop:
+            raise Exception("[EOP] Machine already in End Of Program state.")
+
+        if input_values is not None:
+            self._inputs = deque(input_values)
+
+        d = self._d
+        decoded = self._decoded
+        inputs = self._inputs
+        empty_input = self._empty_input
+        collect = self._collect
+        hook = self._hook
+
+        pc = self._pc
+        rb = self._rb
+        steps = self._steps
+
+        output = None
+        self._waiting = False
+
+        if hook is not None:
+            hook.start(self)
+
+        y = 0
+
+        try:
+            while True:
+                try:
+                    entry = decoded.get(pc)
+                    if entry is None:
+                        entry = decoded[pc] = decode(d[pc], pc)
+
+                    op, m1, m2, m3 = entry
+
+                    if op == 99:
+                        self._eop = True
+
+                        if hook is not None:
+                            hook.step(op, 0, 0, pc, rb)
+
+                        break
+
+                    if m1 == 0:
+                        a1 = d[pc + 1]
+                    elif m1 == 1:
+                        a1 = pc + 1
+                    else:
+                        a1 = rb + d[pc + 1]
+
+                    if op == 3:
+                        if inputs:
+                            x = d[a1] = inputs[0]
+                            inputs.popleft()
+
+                        elif empty_input is not None:
+                            x = d[a1] = empty_input
+                            decoded.pop(a1, None)
+                            pc += 2
+                            steps += 1
+
+                            if hook is not None:
+                                hook.step(op, x, 0, pc, rb)
+
+                            break
+
+                        else:
+                            self._waiting = True
+                            break
+
+                        if a1 in decoded:
+                            del decoded[a1]
+
+                        y = 0
+                        pc += 2
+
+                    elif op == 4:
+                        output = d[a1]
+                        pc += 2
+                        steps += 1
+
+                        if hook is not None:
+                            hook.step(op, output, 0, pc, rb)
+
+                        if collect is None:
+                            break
+
+                        collect.append(output)
+                        output = None
+                        continue
+
+                    elif op == 9:
+                        x = d[a1]
+                        y = 0
+                        rb += x
+                        pc += 2
+
+                    else:
+                        if m2 == 0:
+                            a2 = d[pc + 2]
+                        elif m2 == 1:
+                            a2 = pc + 2
+                        else:
+                            a2 = rb + d[pc + 2]
+
+                        x, y = d[a1], d[a2]
+
+                        if op == 5:
+                            pc = y if x != 0 else pc + 3
+
+                        elif op == 6:
+                            pc = y if x == 0 else pc + 3
+
+                        else:
+                            if m3 == 0:
+                                a3 = d[pc + 3]
+                            elif m3 == 1:
+                                a3 = pc + 3
+                            else:
+                                a3 = rb + d[pc + 3]
+
+                            if op == 1:
+                                d[a3] = x + y
+                            elif op == 2:
+                                d[a3] = x * y
+                            elif op == 7:
+                                d[a3] = 1 if x < y else 0
+                            else:
+                                d[a3] = 1 if x == y else 0
+
+                            if a3 in decoded:
+                                del decoded[a3]
+
+                            pc += 4
+
+                    steps += 1
+
+                    if hook is not None:
+                        hook.step(op, x, y, pc, rb)
+
+                except IndexError:
+                    # Instructions only write as their last step, so after
+                    # growing the memory the instruction can be retried
+                    self._fault(pc, rb)
+                    d = self._d
+
+        finally:
+            self._pc = pc
+            self._rb = rb
+            self._steps = steps
+
+            if hook is not None:
+                hook.stop(self)
+
+        return output
+
+    def run_to_end(self, input_values: Optional[Iterable[int]] = None) -> List[int]:
+        """Run until end of program (or blocked on input) collecting every output."""
+        outputs: List[int] = []
+
+        if input_values is not None:
+            self._inputs = deque(input_values)
+
+        if self._eop:
+            return outputs
+
+        self._collect = outputs
+        try:
+            self.run()
+        finally:
+            self._collect = None
+
+        return outputs
+
+    def stream(self) -> Iterator[Optional[int]]:
+        """
+        Run the machine as a coroutine: yields every output and None each
+        time it blocks waiting for input, ends on end of program. Breaking
+        out of a loop over the generator leaves it suspended so it can be
+        resumed after feeding more input.
+        """
+        while not self._eop:
+            yield self.run()
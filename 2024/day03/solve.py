@@ -4,8 +4,14 @@ from __future__ import annotations
 import argparse
 import contextlib
 import re
+import sys
+import time
 from enum import Enum
-from typing import TextIO
+from typing import TYPE_CHECKING, NamedTuple, TextIO
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator
+    from tracemalloc import Snapshot
 
 
 class Star(Enum):
@@ -30,19 +36,124 @@ class Star(Enum):
         return ValueError
 
 
+class Stopwatch:
+    """Time between the laps of solve() and, tracing allocations, what is allocated at the largest lap."""
+
+    def __init__(self, *, trace_malloc: bool = False) -> None:
+        self.laps: dict[str, float] = {}
+
+        self.trace_malloc = trace_malloc
+        self.allocated = 0
+        self.snapshot: Snapshot | None = None
+
+        if trace_malloc:
+            import tracemalloc  # noqa: PLC0415
+
+            tracemalloc.start()
+
+        self.last = time.perf_counter()
+
+    def lap(self, name: str) -> None:
+        self.laps[name] = time.perf_counter() - self.last
+
+        if self.trace_malloc:
+            import tracemalloc  # noqa: PLC0415
+
+            current, _ = tracemalloc.get_traced_memory()
+            if current > self.allocated:
+                self.allocated = current
+                self.snapshot = tracemalloc.take_snapshot()
+
+        self.last = time.perf_counter()
+
+    def report(self) -> None:
+        for name, elapsed in self.laps.items():
+            print(f"{name}: {elapsed * 1000:.3f} ms", file=sys.stderr)
+
+    def report_allocations(self, top: int) -> None:
+        import tracemalloc  # noqa: PLC0415
+
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        print(f"Peak memory: {peak / 1024:.1f} KiB", file=sys.stderr)
+
+        if self.snapshot is not None:
+            snapshot = self.snapshot.filter_traces((
+                tracemalloc.Filter(inclusive=False, filename_pattern="<frozen importlib._bootstrap>"),
+                tracemalloc.Filter(inclusive=False, filename_pattern="<frozen importlib._bootstrap_external>"),
+            ))
+
+            for stat in snapshot.statistics("lineno")[:top]:
+                print(stat, file=sys.stderr)
+
+
+class Result(NamedTuple):
+    stars: dict[Star, int]
+    laps: dict[str, float]
+
+
+@contextlib.contextmanager
+def profiled(top: int | None) -> Iterator[None]:
+    if top is None:
+        yield
+        return
+
+    import cProfile  # noqa: PLC0415
+    import pstats  # noqa: PLC0415
+
+    with cProfile.Profile() as profile:
+        yield
+
+    pstats.Stats(profile, stream=sys.stderr).sort_stats(pstats.SortKey.CUMULATIVE).print_stats(top)
+
+
 def main() -> None:
     parser = argparse.ArgumentParser()
     parser.add_argument("-i", "--input", type=argparse.FileType("r"), default="input")
     parser.add_argument("-s", "--star", type=Star.argparse, default=Star.ALL, choices=Star)
+    parser.add_argument(
+        "--profile",
+        type=int,
+        nargs="?",
+        const=20,
+        metavar="N",
+        help="profile with cProfile, printing the N (20) functions with the most cumulative time",
+    )
+    parser.add_argument(
+        "--trace-malloc",
+        type=int,
+        nargs="?",
+        const=10,
+        metavar="N",
+        help="trace allocations, printing the peak and the N (10) lines allocating the most",
+    )
+    parser.add_argument("--time", action="store_true", help="print the time taken parsing and by each star")
 
     args = parser.parse_args()
 
-    solve(args.input, args.star)
+    with profiled(args.profile):
+        stopwatch = Stopwatch(trace_malloc=args.trace_malloc is not None)
+        result = solve(args.input, args.star, stopwatch)
+
+    for star, answer in result.stars.items():
+        print(f"Star {star.value}: {answer}")
+
+    if args.time:
+        stopwatch.report()
 
+    if args.trace_malloc is not None:
+        stopwatch.report_allocations(args.trace_malloc)
+
+
+def solve(file_io: TextIO, star: Star = Star.ALL, stopwatch: Stopwatch | None = None) -> Result:
+    stopwatch = stopwatch or Stopwatch()
+    stars: dict[Star, int] = {}
 
-def solve(file_io: TextIO, star: Star = Star.ALL) -> None:
     memory = "\n".join(file_io.readlines())
 
+    stopwatch.lap("parse")
+
     ops = re.finditer(
         r"(?P<OP>mul|do(?:n't)?)\((?:(?P<N1>\d+),(?P<N2>\d+))?\)",
         memory,
@@ -70,10 +181,14 @@ def solve(file_io: TextIO, star: Star = Star.ALL) -> None:
                 enabled = False
 
     if star in {star.ALL, star.ONE}:
-        print(f"Star 1: {s1}")
+        stars[Star.ONE] = s1
+        stopwatch.lap("star 1")
 
     if star in {star.ALL, star.TWO}:
-        print(f"Star 2: {s2}")
+        stars[Star.TWO] = s2
+        stopwatch.lap("star 2")
+
+    return Result(stars, stopwatch.laps)
 
 
 if __name__ == "__main__":
@@ -3,8 +3,19 @@ from __future__ import annotations
 
 import argparse
 import contextlib
+import sys
+import time
 from enum import Enum
-from typing import NamedTuple, TextIO
+from pathlib import Path
+from typing import TYPE_CHECKING, NamedTuple, TextIO
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from aoc.grid import NEWLINE, Grid
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator
+    from tracemalloc import Snapshot
 
 
 class Star(Enum):
@@ -29,103 +40,182 @@ class Star(Enum):
         return ValueError
 
 
+class Stopwatch:
+    """Time between the laps of solve() and, tracing allocations, what is allocated at the largest lap."""
+
+    def __init__(self, *, trace_malloc: bool = False) -> None:
+        self.laps: dict[str, float] = {}
+
+        self.trace_malloc = trace_malloc
+        self.allocated = 0
+        self.snapshot: Snapshot | None = None
+
+        if trace_malloc:
+            import tracemalloc  # noqa: PLC0415
+
+            tracemalloc.start()
+
+        self.last = time.perf_counter()
+
+    def lap(self, name: str) -> None:
+        self.laps[name] = time.perf_counter() - self.last
+
+        if self.trace_malloc:
+            import tracemalloc  # noqa: PLC0415
+
+            current, _ = tracemalloc.get_traced_memory()
+            if current > self.allocated:
+                self.allocated = current
+                self.snapshot = tracemalloc.take_snapshot()
+
+        self.last = time.perf_counter()
+
+    def report(self) -> None:
+        for name, elapsed in self.laps.items():
+            print(f"{name}: {elapsed * 1000:.3f} ms", file=sys.stderr)
+
+    def report_allocations(self, top: int) -> None:
+        import tracemalloc  # noqa: PLC0415
+
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        print(f"Peak memory: {peak / 1024:.1f} KiB", file=sys.stderr)
+
+        if self.snapshot is not None:
+            snapshot = self.snapshot.filter_traces((
+                tracemalloc.Filter(inclusive=False, filename_pattern="<frozen importlib._bootstrap>"),
+                tracemalloc.Filter(inclusive=False, filename_pattern="<frozen importlib._bootstrap_external>"),
+            ))
+
+            for stat in snapshot.statistics("lineno")[:top]:
+                print(stat, file=sys.stderr)
+
+
+class Result(NamedTuple):
+    stars: dict[Star, int]
+    laps: dict[str, float]
+
+
+@contextlib.contextmanager
+def profiled(top: int | None) -> Iterator[None]:
+    if top is None:
+        yield
+        return
+
+    import cProfile  # noqa: PLC0415
+    import pstats  # noqa: PLC0415
+
+    with cProfile.Profile() as profile:
+        yield
+
+    pstats.Stats(profile, stream=sys.stderr).sort_stats(pstats.SortKey.CUMULATIVE).print_stats(top)
+
+
 def main() -> None:
     parser = argparse.ArgumentParser()
     parser.add_argument("-i", "--input", type=argparse.FileType("r"), default="input")
     parser.add_argument("-s", "--star", type=Star.argparse, default=Star.ALL, choices=Star)
+    parser.add_argument(
+        "--profile",
+        type=int,
+        nargs="?",
+        const=20,
+        metavar="N",
+        help="profile with cProfile, printing the N (20) functions with the most cumulative time",
+    )
+    parser.add_argument(
+        "--trace-malloc",
+        type=int,
+        nargs="?",
+        const=10,
+        metavar="N",
+        help="trace allocations, printing the peak and the N (10) lines allocating the most",
+    )
+    parser.add_argument("--time", action="store_true", help="print the time taken parsing and by each star")
 
     args = parser.parse_args()
 
-    solve(args.input, args.star)
-
+    with profiled(args.profile):
+        stopwatch = Stopwatch(trace_malloc=args.trace_malloc is not None)
+        result = solve(args.input, args.star, stopwatch)
 
-class Point(NamedTuple):
-    x: int
-    y: int
+    for star, answer in result.stars.items():
+        print(f"Star {star.value}: {answer}")
 
-    def __add__(self, other: object) -> Point:
-        if not isinstance(other, self.__class__):
-            raise NotImplementedError
-        return Point(self.x + other.x, self.y + other.y)
+    if args.time:
+        stopwatch.report()
 
-    def __sub__(self, other: object) -> Point:
-        if not isinstance(other, self.__class__):
-            raise NotImplementedError
-        return Point(self.x - other.x, self.y - other.y)
+    if args.trace_malloc is not None:
+        stopwatch.report_allocations(args.trace_malloc)
 
 
-class Element(Enum):
-    EMPTY = "."
-    OBSTACLE = "#"
-    GUARD = "^"
+OBSTACLE = ord("#")
+EMPTY = ord(".")
+GUARD = ord("^")
 
 
-DIRS = [
-    Point(0, -1),  # ^
-    Point(1, 0),   # >
-    Point(0, 1),   # v
-    Point(-1, 0),  # <
-]
+def obstacle_creates_loop(lab: Grid, obstacle: int, nxt_dir: int) -> bool:
+    # Hot loop, working on the grid cells straight
+    cells, steps, size = lab.cells, lab.steps, len(lab)
 
+    cells[obstacle] = OBSTACLE
 
-def obstacle_creates_loop(lab: dict[Point, Element], obstacle: Point, nxt_dir: int) -> bool:
-    lab[obstacle] = Element.OBSTACLE
+    visited: set[int] = set()
 
-    visited: set[tuple[Point, int]] = set()
+    current = obstacle - steps[nxt_dir]
 
-    current = obstacle - DIRS[nxt_dir]
-
-    while current in lab:
-        if (current, nxt_dir) in visited:
-            lab[obstacle] = Element.EMPTY
+    while 0 <= current < size and cells[current] != NEWLINE:
+        # Position and direction packed in a single int
+        state = current * 4 + nxt_dir
+        if state in visited:
+            cells[obstacle] = EMPTY
             return True
 
-        visited.add((current, nxt_dir))
+        visited.add(state)
 
-        new = current + DIRS[nxt_dir]
-        if new not in lab:
+        new = current + steps[nxt_dir]
+        if not (0 <= new < size and cells[new] != NEWLINE):
             break
 
-        while lab[new] == Element.OBSTACLE:
-            nxt_dir = (nxt_dir + 1) % len(DIRS)
-            new = current + DIRS[nxt_dir]
+        while cells[new] == OBSTACLE:
+            nxt_dir = (nxt_dir + 1) % len(steps)
+            new = current + steps[nxt_dir]
 
         current = new
 
-    lab[obstacle] = Element.EMPTY
+    cells[obstacle] = EMPTY
     return False
 
 
-def solve(file_io: TextIO, star: Star = Star.ALL) -> None:
-    lab: dict[Point, Element] = {}
-    guard = Point(-1, -1)
+def solve(file_io: TextIO, star: Star = Star.ALL, stopwatch: Stopwatch | None = None) -> Result:
+    stopwatch = stopwatch or Stopwatch()
+    stars: dict[Star, int] = {}
+
+    lab = Grid(file_io.read())
 
-    for y, line in enumerate(file_io):
-        for x, element in enumerate(line.strip()):
-            pt = Point(x, y)
-            lab[pt] = Element(element)
+    guard = lab.find(GUARD)
+    lab[guard] = EMPTY
 
-            if lab[pt] == Element.GUARD:
-                lab[pt] = Element.EMPTY
-                guard = pt
+    stopwatch.lap("parse")
 
-    visited: set[Point] = set()
-    obstacle_loops: set[Point] = set()
+    visited: set[int] = set()
+    obstacle_loops: set[int] = set()
 
     nxt_dir = 0
     current = guard
 
-    while current in lab:
+    while lab.inside(current):
         visited.add(current)
 
-        new = current + DIRS[nxt_dir]
-        if new not in lab:
+        new = current + lab.steps[nxt_dir]
+        if not lab.inside(new):
             break
 
         # If new possition is an obstacle make next possible 90º turn
-        while lab[new] == Element.OBSTACLE:
-            nxt_dir = (nxt_dir + 1) % len(DIRS)
-            new = current + DIRS[nxt_dir]
+        while lab[new] == OBSTACLE:
+            nxt_dir = (nxt_dir + 1) % len(lab.steps)
+            new = current + lab.steps[nxt_dir]
 
         if star in {star.ALL, star.TWO} and \
            new not in visited and \
@@ -136,11 +226,15 @@ def solve(file_io: TextIO, star: Star = Star.ALL) -> None:
 
     if star in {star.ALL, star.ONE}:
         s1 = len(visited)
-        print(f"Star 1: {s1}")
+        stars[Star.ONE] = s1
+        stopwatch.lap("star 1")
 
     if star in {star.ALL, star.TWO}:
         s2 = len(obstacle_loops)
-        print(f"Star 2: {s2}")
+        stars[Star.TWO] = s2
+        stopwatch.lap("star 2")
+
+    return Result(stars, stopwatch.laps)
 
 
 if __name__ == "__main__":
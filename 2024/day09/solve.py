@@ -3,8 +3,14 @@ from __future__ import annotations
 
 import argparse
 import contextlib
+import sys
+import time
 from enum import Enum
-from typing import NamedTuple, TextIO
+from typing import TYPE_CHECKING, NamedTuple, TextIO
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator
+    from tracemalloc import Snapshot
 
 
 class Star(Enum):
@@ -29,91 +35,210 @@ class Star(Enum):
         return ValueError
 
 
+class Stopwatch:
+    """Time between the laps of solve() and, tracing allocations, what is allocated at the largest lap."""
+
+    def __init__(self, *, trace_malloc: bool = False) -> None:
+        self.laps: dict[str, float] = {}
+
+        self.trace_malloc = trace_malloc
+        self.allocated = 0
+        self.snapshot: Snapshot | None = None
+
+        if trace_malloc:
+            import tracemalloc  # noqa: PLC0415
+
+            tracemalloc.start()
+
+        self.last = time.perf_counter()
+
+    def lap(self, name: str) -> None:
+        self.laps[name] = time.perf_counter() - self.last
+
+        if self.trace_malloc:
+            import tracemalloc  # noqa: PLC0415
+
+            current, _ = tracemalloc.get_traced_memory()
+            if current > self.allocated:
+                self.allocated = current
+                self.snapshot = tracemalloc.take_snapshot()
+
+        self.last = time.perf_counter()
+
+    def report(self) -> None:
+        for name, elapsed in self.laps.items():
+            print(f"{name}: {elapsed * 1000:.3f} ms", file=sys.stderr)
+
+    def report_allocations(self, top: int) -> None:
+        import tracemalloc  # noqa: PLC0415
+
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        print(f"Peak memory: {peak / 1024:.1f} KiB", file=sys.stderr)
+
+        if self.snapshot is not None:
+            snapshot = self.snapshot.filter_traces((
+                tracemalloc.Filter(inclusive=False, filename_pattern="<frozen importlib._bootstrap>"),
+                tracemalloc.Filter(inclusive=False, filename_pattern="<frozen importlib._bootstrap_external>"),
+            ))
+
+            for stat in snapshot.statistics("lineno")[:top]:
+                print(stat, file=sys.stderr)
+
+
+class Result(NamedTuple):
+    stars: dict[Star, int]
+    laps: dict[str, float]
+
+
+@contextlib.contextmanager
+def profiled(top: int | None) -> Iterator[None]:
+    if top is None:
+        yield
+        return
+
+    import cProfile  # noqa: PLC0415
+    import pstats  # noqa: PLC0415
+
+    with cProfile.Profile() as profile:
+        yield
+
+    pstats.Stats(profile, stream=sys.stderr).sort_stats(pstats.SortKey.CUMULATIVE).print_stats(top)
+
+
 def main() -> None:
     parser = argparse.ArgumentParser()
     parser.add_argument("-i", "--input", type=argparse.FileType("r"), default="input")
     parser.add_argument("-s", "--star", type=Star.argparse, default=Star.ALL, choices=Star)
+    parser.add_argument(
+        "--profile",
+        type=int,
+        nargs="?",
+        const=20,
+        metavar="N",
+        help="profile with cProfile, printing the N (20) functions with the most cumulative time",
+    )
+    parser.add_argument(
+        "--trace-malloc",
+        type=int,
+        nargs="?",
+        const=10,
+        metavar="N",
+        help="trace allocations, printing the peak and the N (10) lines allocating the most",
+    )
+    parser.add_argument("--time", action="store_true", help="print the time taken parsing and by each star")
 
     args = parser.parse_args()
 
-    solve(args.input, args.star)
+    with profiled(args.profile):
+        stopwatch = Stopwatch(trace_malloc=args.trace_malloc is not None)
+        result = solve(args.input, args.star, stopwatch)
 
+    for star, answer in result.stars.items():
+        print(f"Star {star.value}: {answer}")
 
-def solve(file_io: TextIO, star: Star = Star.ALL) -> None:
-    data = [int(n) for n in file_io.readline().strip()]
+    if args.time:
+        stopwatch.report()
 
-    if star in {star.ALL, star.ONE}:
-        disk = data.copy()
+    if args.trace_malloc is not None:
+        stopwatch.report_allocations(args.trace_malloc)
 
-        checksum = 0
 
-        lbid = 0
-        rbid = len(disk) // 2
+def compact_blocks(data: list[int]) -> int:
+    disk = data.copy()
 
-        i = 0
-        free_space = False
-        while disk:
-            size, disk = disk[0], disk[1:]
+    checksum = 0
 
-            if free_space:
-                for _ in range(size):
-                    checksum += i * rbid
-                    i += 1
+    lbid = 0
+    rbid = len(disk) // 2
 
-                    if disk[-1] == 1:
-                        disk = disk[:-2]
-                        rbid -= 1
+    i = 0
+    free_space = False
+    while disk:
+        size, disk = disk[0], disk[1:]
 
-                    else:
-                        disk[-1] -= 1
+        if free_space:
+            for _ in range(size):
+                checksum += i * rbid
+                i += 1
 
-            else:
-                for _ in range(size):
-                    checksum += i * lbid
-                    i += 1
+                if disk[-1] == 1:
+                    disk = disk[:-2]
+                    rbid -= 1
 
-                lbid += 1
+                else:
+                    disk[-1] -= 1
 
-            free_space = not free_space
+        else:
+            for _ in range(size):
+                checksum += i * lbid
+                i += 1
 
-        s1 = checksum
-        print(f"Star 1: {s1}")
+            lbid += 1
 
-    if star in {star.ALL, star.TWO}:
-        disk = [[-1 if i % 2 else i // 2, size] for i, size in enumerate(data) if size > 0]
+        free_space = not free_space
 
-        src = 0
-        while src < len(disk):
-            src += 1
+    return checksum
 
-            fid, size = disk[-src]
-            if fid == -1:
+
+def compact_files(data: list[int]) -> int:
+    disk = [[-1 if i % 2 else i // 2, size] for i, size in enumerate(data) if size > 0]
+
+    src = 0
+    while src < len(disk):
+        src += 1
+
+        fid, size = disk[-src]
+        if fid == -1:
+            continue
+
+        for dst in range(len(disk) - src):
+            if disk[dst][0] != -1 or disk[dst][1] < size:
                 continue
 
-            for dst in range(len(disk) - src):
-                if disk[dst][0] != -1 or disk[dst][1] < size:
-                    continue
+            # Same size -> replace in place
+            if disk[dst][1] == size:
+                disk[dst][0] = fid
 
-                # Same size -> replace in place
-                if disk[dst][1] == size:
-                    disk[dst][0] = fid
+            # Different size -> substract size, insert before space
+            else:
+                disk[dst][1] -= size
+                disk.insert(dst, disk[-src].copy())
 
-                # Different size -> substract size, insert before space
-                else:
-                    disk[dst][1] -= size
-                    disk.insert(dst, disk[-src].copy())
+            disk[-src][0] = -1
+            break
 
-                disk[-src][0] = -1
-                break
+    checksum = 0
+    i = 0
+    for fid, size in disk:
+        checksum += int(fid * size * (i + ((size - 1) / 2))) if fid != -1 else 0
+        i += size
+
+    return checksum
+
+
+def solve(file_io: TextIO, star: Star = Star.ALL, stopwatch: Stopwatch | None = None) -> Result:
+    stopwatch = stopwatch or Stopwatch()
+    stars: dict[Star, int] = {}
+
+    data = [int(n) for n in file_io.readline().strip()]
+
+    stopwatch.lap("parse")
+
+    if star in {star.ALL, star.ONE}:
+        s1 = compact_blocks(data)
+
+        stars[Star.ONE] = s1
+        stopwatch.lap("star 1")
+
+    if star in {star.ALL, star.TWO}:
+        s2 = compact_files(data)
 
-        checksum = 0
-        i = 0
-        for fid, size in disk:
-            checksum += int(fid * size * (i + ((size - 1) / 2))) if fid != -1 else 0
-            i += size
+        stars[Star.TWO] = s2
+        stopwatch.lap("star 2")
 
-        s2 = checksum
-        print(f"Star 2: {s2}")
+    return Result(stars, stopwatch.laps)
 
 
 if __name__ == "__main__":
@@ -3,8 +3,19 @@ from __future__ import annotations
 
 import argparse
 import contextlib
+import sys
+import time
 from enum import Enum
-from typing import NamedTuple, TextIO
+from pathlib import Path
+from typing import TYPE_CHECKING, NamedTuple, TextIO
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from aoc.grid import Grid
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator
+    from tracemalloc import Snapshot
 
 
 class Star(Enum):
@@ -29,58 +40,158 @@ class Star(Enum):
         return ValueError
 
 
+class Stopwatch:
+    """Time between the laps of solve() and, tracing allocations, what is allocated at the largest lap."""
+
+    def __init__(self, *, trace_malloc: bool = False) -> None:
+        self.laps: dict[str, float] = {}
+
+        self.trace_malloc = trace_malloc
+        self.allocated = 0
+        self.snapshot: Snapshot | None = None
+
+        if trace_malloc:
+            import tracemalloc  # noqa: PLC0415
+
+            tracemalloc.start()
+
+        self.last = time.perf_counter()
+
+    def lap(self, name: str) -> None:
+        self.laps[name] = time.perf_counter() - self.last
+
+        if self.trace_malloc:
+            import tracemalloc  # noqa: PLC0415
+
+            current, _ = tracemalloc.get_traced_memory()
+            if current > self.allocated:
+                self.allocated = current
+                self.snapshot = tracemalloc.take_snapshot()
+
+        self.last = time.perf_counter()
+
+    def report(self) -> None:
+        for name, elapsed in self.laps.items():
+            print(f"{name}: {elapsed * 1000:.3f} ms", file=sys.stderr)
+
+    def report_allocations(self, top: int) -> None:
+        import tracemalloc  # noqa: PLC0415
+
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        print(f"Peak memory: {peak / 1024:.1f} KiB", file=sys.stderr)
+
+        if self.snapshot is not None:
+            snapshot = self.snapshot.filter_traces((
+                tracemalloc.Filter(inclusive=False, filename_pattern="<frozen importlib._bootstrap>"),
+                tracemalloc.Filter(inclusive=False, filename_pattern="<frozen importlib._bootstrap_external>"),
+            ))
+
+            for stat in snapshot.statistics("lineno")[:top]:
+                print(stat, file=sys.stderr)
+
+
+class Result(NamedTuple):
+    stars: dict[Star, int]
+    laps: dict[str, float]
+
+
+@contextlib.contextmanager
+def profiled(top: int | None) -> Iterator[None]:
+    if top is None:
+        yield
+        return
+
+    import cProfile  # noqa: PLC0415
+    import pstats  # noqa: PLC0415
+
+    with cProfile.Profile() as profile:
+        yield
+
+    pstats.Stats(profile, stream=sys.stderr).sort_stats(pstats.SortKey.CUMULATIVE).print_stats(top)
+
+
 def main() -> None:
     parser = argparse.ArgumentParser()
     parser.add_argument("-i", "--input", type=argparse.FileType("r"), default="input")
     parser.add_argument("-s", "--star", type=Star.argparse, default=Star.ALL, choices=Star)
+    parser.add_argument(
+        "--profile",
+        type=int,
+        nargs="?",
+        const=20,
+        metavar="N",
+        help="profile with cProfile, printing the N (20) functions with the most cumulative time",
+    )
+    parser.add_argument(
+        "--trace-malloc",
+        type=int,
+        nargs="?",
+        const=10,
+        metavar="N",
+        help="trace allocations, printing the peak and the N (10) lines allocating the most",
+    )
+    parser.add_argument("--time", action="store_true", help="print the time taken parsing and by each star")
 
     args = parser.parse_args()
 
-    solve(args.input, args.star)
+    with profiled(args.profile):
+        stopwatch = Stopwatch(trace_malloc=args.trace_malloc is not None)
+        result = solve(args.input, args.star, stopwatch)
+
+    for star, answer in result.stars.items():
+        print(f"Star {star.value}: {answer}")
 
+    if args.time:
+        stopwatch.report()
 
-class Point(NamedTuple):
-    x: int
-    y: int
+    if args.trace_malloc is not None:
+        stopwatch.report_allocations(args.trace_malloc)
 
-    def __add__(self, other: object) -> Point:
-        if not isinstance(other, self.__class__):
-            raise NotImplementedError
-        return Point(self.x + other.x, self.y + other.y)
 
+TRAILHEAD = ord("0")
+HILLTOP = ord("9")
 
-def find_reachable_hilltops(topo_map: dict[Point, int], current_pt: Point) -> list[Point]:
-    if topo_map[current_pt] == 9:
-        return [current_pt]
 
-    hilltops: list[Point] = []
+def find_reachable_hilltops(topo_map: Grid, current: int) -> list[int]:
+    if topo_map[current] == HILLTOP:
+        return [current]
 
-    for direction in {Point(1, 0), Point(-1, 0), Point(0, 1), Point(0, -1)}:
-        next_pt = current_pt + direction
-        if next_pt not in topo_map:
-            continue
+    hilltops: list[int] = []
 
-        if topo_map[next_pt] == topo_map[current_pt] + 1:
-            hilltops.extend(find_reachable_hilltops(topo_map, next_pt))
+    for nxt in topo_map.neighbors(current):
+        if topo_map[nxt] == topo_map[current] + 1:
+            hilltops.extend(find_reachable_hilltops(topo_map, nxt))
 
     return hilltops
 
 
-def solve(file_io: TextIO, star: Star = Star.ALL) -> None:
-    topo_map = {Point(x, y): int(height) for y, line in enumerate(file_io) for x, height in enumerate(line.strip())}
+def solve(file_io: TextIO, star: Star = Star.ALL, stopwatch: Stopwatch | None = None) -> Result:
+    stopwatch = stopwatch or Stopwatch()
+    stars: dict[Star, int] = {}
 
-    tailheads = [pt for pt, height in topo_map.items() if height == 0]
+    # Heights kept as their digits, "0" to "9" being consecutive
+    topo_map = Grid(file_io.read())
+
+    stopwatch.lap("parse")
+
+    tailheads = topo_map.find_all(TRAILHEAD)
 
     tailheads_hilltops = [find_reachable_hilltops(topo_map, pt) for pt in tailheads]
 
     if star in {star.ALL, star.ONE}:
         s1 = sum(len(set(hilltops)) for hilltops in tailheads_hilltops)
-        print(f"Star 1: {s1}")
+        stars[Star.ONE] = s1
+        stopwatch.lap("star 1")
 
     if star in {star.ALL, star.TWO}:
         s2 = sum(len(hilltops) for hilltops in tailheads_hilltops)
 
-        print(f"Star 2: {s2}")
+        stars[Star.TWO] = s2
+        stopwatch.lap("star 2")
+
+    return Result(stars, stopwatch.laps)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,8 @@
+"""
+Helpers shared by the days of every year, imported by module so a day
+only pays for what it uses at startup:
+
+  aoc.cache   parse cache of the inputs
+  aoc.coords  coordinates packed in an int, with neighbor offset tables
+  aoc.grid    grids stored flat, addressed by int index
+"""
@@ -0,0 +1,113 @@
+"""
+Cache of parsed inputs.
+
+cached(path, parser) returns parser(text of the file), storing the result
+the first time under a key made of the SHA-256 of the file contents, the
+parser name and a digest of its code, and an explicit version for parsers
+whose output depends on code elsewhere. Later runs map the stored file and
+load it instead of parsing.
+
+Lists of ints (Intcode programs) are stored raw as 64-bit ints, anything
+else pickled. Loading a pickle rebuilds every object in it, so structures
+made of many small objects (dict[Point, ...] grids) load no faster than
+they parse: cache what is costly to compute, not what is large.
+
+AOC_CACHE sets the cache directory (.cache/parse at the root of the
+repository by default), AOC_CACHE=0 disables the cache.
+"""
+import hashlib
+import marshal
+import mmap
+import os
+import pickle
+
+from array import array
+from typing import Callable, Optional, TypeVar
+
+T = TypeVar("T")
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+DIRECTORY = os.environ.get("AOC_CACHE", os.path.join(ROOT, ".cache", "parse"))
+ENABLED = DIRECTORY not in ("", "0")
+
+# Magic and format of the stored files
+INTS = b"AOCPINTS"
+PICKLE = b"AOCPPKL5"
+
+
+def key(content: bytes, parser: Callable, version: int) -> str:
+    h = hashlib.sha256(content)
+    h.update(f"{parser.__module__}.{parser.__qualname__}/{version}".encode())
+    h.update(marshal.dumps(parser.__code__))
+
+    return h.hexdigest()
+
+
+def encode(value) -> bytes:
+    if isinstance(value, list) and all(type(v) is int for v in value):
+        try:
+            return INTS + array("q", value).tobytes()
+        except OverflowError:
+            pass
+
+    return PICKLE + pickle.dumps(value, protocol=5)
+
+
+def decode(path: str):
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        with memoryview(mm) as view:
+            magic, body = bytes(view[:8]), view[8:]
+
+            try:
+                if magic == INTS:
+                    with body.cast("q") as ints:
+                        return ints.tolist()
+
+                if magic == PICKLE:
+                    return pickle.loads(body)
+
+                raise ValueError(f"Unknown cache format {magic!r}")
+
+            finally:
+                body.release()
+
+
+def store(path: str, value):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(encode(value))
+
+    os.replace(tmp, path)
+
+
+def cached(path: str, parser: Callable[[str], T], version: int = 0, directory: Optional[str] = None) -> T:
+    """parser(text of the file at `path`), from the cache when parsed before."""
+    with open(path, "rb") as f:
+        content = f.read()
+
+    if directory is None:
+        if not ENABLED:
+            return parser(content.decode())
+
+        directory = DIRECTORY
+
+    entry = os.path.join(directory, key(content, parser, version))
+
+    try:
+        return decode(entry)
+    except Exception:
+        # Not cached yet, truncated or stale (a pickled class moved)
+        pass
+
+    value = parser(content.decode())
+
+    try:
+        store(entry, value)
+    except OSError:
+        # Read-only checkout, parse every time
+        pass
+
+    return value
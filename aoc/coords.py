@@ -0,0 +1,70 @@
+"""
+Coordinates packed in a single int.
+
+pack(x, y) puts each coordinate, biased to be non negative, in a field of
+BITS bits, x the most significant one. Moving is adding an offset from
+the tables below (or offset(dx, dy)), with no tuple allocated nor hashed
+on the way. Packed ints sort like the tuples they come from, so sorting
+Point(x, y) NamedTuples and sorting their packed ints agree.
+
+Coordinates must stay within [-BIAS, BIAS), moving past those limits
+silently wraps into the next field. For a fixed rectangle read from the
+input aoc.grid is lighter, this is for unbounded spaces (and 3-D ones).
+
+Convert at the boundaries, pack(*pt) from a NamedTuple and
+Point(*unpack(p)) back to one.
+"""
+from typing import Tuple
+
+BITS = 21
+SPAN = 1 << BITS
+MASK = SPAN - 1
+BIAS = SPAN >> 1
+
+
+def pack(x: int, y: int) -> int:
+    return (x + BIAS) << BITS | (y + BIAS)
+
+
+def unpack(p: int) -> Tuple[int, int]:
+    return (p >> BITS) - BIAS, (p & MASK) - BIAS
+
+
+def offset(dx: int, dy: int) -> int:
+    """Packed step by (dx, dy), added to a packed point to move it."""
+    return dx * SPAN + dy
+
+
+def manhattan(p: int, q: int) -> int:
+    (px, py), (qx, qy) = unpack(p), unpack(q)
+    return abs(px - qx) + abs(py - qy)
+
+
+def pack3(x: int, y: int, z: int) -> int:
+    return ((x + BIAS) << BITS | (y + BIAS)) << BITS | (z + BIAS)
+
+
+def unpack3(p: int) -> Tuple[int, int, int]:
+    return (p >> 2 * BITS) - BIAS, (p >> BITS & MASK) - BIAS, (p & MASK) - BIAS
+
+
+def offset3(dx: int, dy: int, dz: int) -> int:
+    return (dx * SPAN + dy) * SPAN + dz
+
+
+def manhattan3(p: int, q: int) -> int:
+    (px, py, pz), (qx, qy, qz) = unpack3(p), unpack3(q)
+    return abs(px - qx) + abs(py - qy) + abs(pz - qz)
+
+
+# Neighbor offsets, each table in ascending order: p + step goes through
+# the neighbors of p sorted (in reading order when x is the row)
+
+ORTHOGONAL = tuple(sorted(offset(dx, dy) for dx, dy in ((-1, 0), (0, -1), (0, 1), (1, 0))))
+
+AROUND = tuple(sorted(offset(dx, dy) for dx in (-1, 0, 1) for dy in (-1, 0, 1) if dx or dy))
+
+ORTHOGONAL3 = tuple(sorted(offset3(*d) for d in ((-1, 0, 0), (0, -1, 0), (0, 0, -1), (0, 0, 1), (0, 1, 0), (1, 0, 0))))
+
+AROUND3 = tuple(sorted(offset3(dx, dy, dz)
+                       for dx in (-1, 0, 1) for dy in (-1, 0, 1) for dz in (-1, 0, 1) if dx or dy or dz))
@@ -0,0 +1,82 @@
+"""
+Grids of single character cells stored flat.
+
+The cells are the bytes of the input text as they are, newlines included:
+row y starts at index y * stride, stride being the width plus the
+newline. The newline closing each row is a sentinel, a step off the left
+or right edge lands on one (or before the first cell), and a step off the
+top or bottom edge leaves the bytearray. Moving is adding an offset to an
+int index, and checking bounds is a comparison and a byte lookup, with no
+tuple allocated nor hashed on the way.
+"""
+from typing import Iterator, List, Tuple
+
+NEWLINE = ord("\n")
+
+
+class Grid:
+    def __init__(self, text: str):
+        rows = text.splitlines()
+
+        self.width = len(rows[0]) if rows else 0
+        self.height = len(rows)
+        self.stride = self.width + 1
+
+        if any(len(row) != self.width for row in rows):
+            raise ValueError("Rows of a grid must have the same width")
+
+        self.cells = bytearray("".join(row + "\n" for row in rows).encode())
+
+        # Offset of a step up, right, down and left (clockwise from up)
+        self.steps: Tuple[int, int, int, int] = (-self.stride, 1, self.stride, -1)
+
+    def __len__(self) -> int:
+        return len(self.cells)
+
+    def __getitem__(self, i: int) -> int:
+        return self.cells[i]
+
+    def __setitem__(self, i: int, value: int):
+        self.cells[i] = value
+
+    def inside(self, i: int) -> bool:
+        return 0 <= i < len(self.cells) and self.cells[i] != NEWLINE
+
+    def index(self, x: int, y: int) -> int:
+        return y * self.stride + x
+
+    def point(self, i: int) -> Tuple[int, int]:
+        y, x = divmod(i, self.stride)
+        return x, y
+
+    def indexes(self) -> Iterator[int]:
+        """Index of every cell, row by row."""
+        for y in range(self.height):
+            yield from range(y * self.stride, y * self.stride + self.width)
+
+    def find(self, value: int) -> int:
+        """Index of the first cell holding `value`, -1 if none does."""
+        return self.cells.find(value)
+
+    def find_all(self, value: int) -> List[int]:
+        found = []
+
+        i = self.cells.find(value)
+        while i != -1:
+            found.append(i)
+            i = self.cells.find(value, i + 1)
+
+        return found
+
+    def neighbors(self, i: int) -> Iterator[int]:
+        """Cells up, right, down and left of `i` inside the grid."""
+        cells = self.cells
+        size = len(cells)
+
+        for step in self.steps:
+            j = i + step
+            if 0 <= j < size and cells[j] != NEWLINE:
+                yield j
+
+    def __str__(self) -> str:
+        return self.cells.decode()
@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+"""
+Benchmarks the solvers and keeps a history of the results per git commit.
+
+Every selected day runs `--warmup` times unmeasured (filling the page
+cache, building the Go days) and then `--runs` times through run.py. The
+median and 95th percentile of the wall time, the median of each star and
+the peak resident set size are stored in the history file under the
+current commit (suffixed with "+dirty" when the tree has changes), merged
+with what was stored for it before.
+
+The results are compared to a baseline commit, by default the last one
+of the history benchmarking the same day. A day whose median is slower
+than the baseline by more than `--threshold` (and by more than `--floor`
+seconds, below which timings are noise) is a regression, and makes the
+exit status 1.
+
+Usage: python3 bench.py [2019 2024/day06 ...] [--intcode] [-n RUNS] [--baseline COMMIT]
+"""
+import argparse
+import json
+import math
+import os
+import statistics
+import subprocess
+import sys
+
+from datetime import datetime, timezone
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+import run
+
+from run import Result, Solver
+
+
+HISTORY = run.HISTORY
+
+
+class Stats(NamedTuple):
+    solver: Solver
+    runs: int
+    median: float
+    p95: float
+    # Star number to median seconds
+    stars: Dict[int, float]
+    # KiB
+    rss: Optional[int]
+    error: Optional[str]
+
+
+def percentile(values: Sequence[float], p: float) -> float:
+    """Nearest-rank percentile."""
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(len(ordered) * p / 100) - 1)]
+
+
+def intcode(solvers: List[Solver]) -> List[Solver]:
+    """Solvers running on the shared Intcode machine."""
+    selected = []
+
+    for solver in solvers:
+        if solver.convention != "go":
+            with open(solver.entry, "r") as f:
+                if "from intcode import" in f.read():
+                    selected.append(solver)
+
+    return selected
+
+
+def measure(solver: Solver, runs: int, warmup: int, timeout: Optional[float]) -> Stats:
+    for _ in range(warmup):
+        result = run.run(solver, timeout=timeout)
+
+        if result.error is not None:
+            return Stats(solver, 0, 0.0, 0.0, {}, None, result.error)
+
+    results: List[Result] = []
+    for _ in range(runs):
+        result = run.run(solver, timeout=timeout)
+
+        if result.error is not None:
+            return Stats(solver, len(results), 0.0, 0.0, {}, None, result.error)
+
+        results.append(result)
+
+    totals = [r.total for r in results]
+    stars = {n: statistics.median(r.stars[n][1] for r in results) for n in sorted(results[0].stars)}
+    rss = max((r.rss for r in results if r.rss is not None), default=None)
+
+    return Stats(solver, runs, statistics.median(totals), percentile(totals, 95), stars, rss, None)
+
+
+def commit() -> str:
+    """Short hash of HEAD, "+dirty" when tracked files have changes."""
+    head = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=run.ROOT,
+                          capture_output=True, text=True, check=True).stdout.strip()
+    dirty = subprocess.run(["git", "diff", "--quiet", "HEAD"], cwd=run.ROOT).returncode
+
+    return head + "+dirty" if dirty else head
+
+
+def load(path: str) -> dict:
+    if not os.path.exists(path):
+        return {}
+
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+def save(path: str, history: dict):
+    with open(path + ".tmp", "w") as f:
+        json.dump(history, f, indent=2)
+        f.write("\n")
+
+    os.replace(path + ".tmp", path)
+
+
+def record(history: dict, key: str, measured: List[Stats]):
+    """Store the days measured under `key`, as its latest entry."""
+    entry = history.pop(key, {"days": {}})
+    entry["date"] = datetime.now(timezone.utc).isoformat(timespec="seconds")
+    entry["python"] = sys.version.split()[0]
+
+    for s in measured:
+        if s.error is None:
+            entry["days"][s.solver.name] = {
+                "runs": s.runs,
+                "median": round(s.median, 6),
+                "p95": round(s.p95, 6),
+                "stars": {str(n): round(t, 6) for n, t in s.stars.items()},
+                "rss": s.rss,
+            }
+
+    history[key] = entry
+
+
+def baseline(history: dict, day: str, key: str, wanted: Optional[str]) -> Optional[str]:
+    """Commit to compare the day to, the latest other one having it unless `wanted`."""
+    if wanted is not None:
+        return wanted if day in history.get(wanted, {}).get("days", {}) else None
+
+    for other in reversed(list(history)):
+        if other != key and day in history[other]["days"]:
+            return other
+
+    return None
+
+
+def table(measured: List[Stats], history: dict, key: str, wanted: Optional[str],
+          threshold: float, floor: float) -> Tuple[str, int]:
+    width = max((len(s.solver.name) for s in measured), default=3)
+
+    lines = [f"{'day':<{width}} {'runs':>4} {'median':>8} {'p95':>8} {'star 1':>8} {'star 2':>8} "
+             f"{'rss MiB':>8} {'baseline':>8} {'change':>7}"]
+    regressions = 0
+
+    for s in measured:
+        if s.error is not None:
+            lines.append(f"{s.solver.name:<{width}} {s.runs:>4}  ! {s.error}")
+            continue
+
+        row = f"{s.solver.name:<{width}} {s.runs:>4} {s.median:8.3f} {s.p95:8.3f} "
+        row += " ".join(run.seconds(s.stars.get(n)) for n in (1, 2))
+        row += f" {s.rss / 1024:8.1f}" if s.rss is not None else f" {'-':>8}"
+
+        base = baseline(history, s.solver.name, key, wanted)
+        if base is not None:
+            before = history[base]["days"][s.solver.name]["median"]
+            change = (s.median - before) / before if before else 0.0
+            row += f" {base[:8]:>8} {change:+7.1%}"
+
+            if change > threshold and s.median - before > floor:
+                row += "  REGRESSION"
+                regressions += 1
+
+        lines.append(row)
+
+    lines.append(f"{len(measured)} days, {regressions} regressions over {threshold:.0%}")
+
+    return "\n".join(lines), regressions
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the solvers against a stored baseline")
+    parser.add_argument("days", nargs="*", help="years or days to benchmark (2019, 2024/day06), all by default")
+    parser.add_argument("--intcode", action="store_true", help="only the days running on the Intcode machine")
+    parser.add_argument("--go", action="store_true", help="include the Go days (needs the go toolchain)")
+    parser.add_argument("-n", "--runs", type=int, default=5, help="measured runs per day (default 5)")
+    parser.add_argument("-w", "--warmup", type=int, default=1, help="unmeasured runs first (default 1)")
+    parser.add_argument("--timeout", type=float, help="seconds before a run is killed")
+    parser.add_argument("--history", default=HISTORY, help="history file (default bench.json)")
+    parser.add_argument("--baseline", help="commit to compare to, the last one benchmarking each day by default")
+    parser.add_argument("--threshold", type=float, default=0.10, help="slowdown flagged (default 0.10, 10%%)")
+    parser.add_argument("--floor", type=float, default=0.01,
+                        help="slowdowns under this many seconds are ignored (default 0.01)")
+    parser.add_argument("--no-save", action="store_true", help="do not record the results in the history")
+    args = parser.parse_args(argv)
+
+    if args.runs < 1:
+        parser.error("at least one run is needed")
+
+    solvers = run.select(run.discover(go=args.go), args.days)
+    if args.intcode:
+        solvers = intcode(solvers)
+
+    history = load(args.history)
+    key = commit()
+
+    measured = []
+    for solver in solvers:
+        stats = measure(solver, args.runs, args.warmup, args.timeout)
+        measured.append(stats)
+        print(f"{solver.name}: {stats.median:.3f}s" + (f" ({stats.error})" if stats.error else ""), file=sys.stderr)
+
+    text, regressions = table(measured, history, key, args.baseline, args.threshold, args.floor)
+    print(f"commit {key}")
+    print(text)
+
+    if not args.no_save:
+        record(history, key, measured)
+        save(args.history, history)
+
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
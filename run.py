@@ -0,0 +1,602 @@
+#!/usr/bin/env python3
+"""
+Runs the solvers of every year and times them.
+
+Each day directory has one solver: its Python script (the one with the
+shortest name, longer ones are alternative versions) or, for the Go days,
+its Go module. Solvers run in their own process, adapted to the calling
+convention of their year:
+
+  argv  2017-2019 and 2021 scripts, input file (or value) as argument
+  solve 2024 solve.py, imported and its solve() called on the input
+  go    2021/2022 Go modules, built first and run with -f input.txt
+
+Timings per day:
+
+  start  interpreter startup (Python) or build (Go)
+  parse  from the start of the script until it has read all its input
+  star   from the previous mark until the star answer is printed
+
+With --jobs, days run concurrently, the longest first by their median in
+the benchmark history (bench.json, see bench.py) and the days never
+benchmarked before all of them. The table keeps the order of the days;
+timings of concurrent days include their contention for the CPUs.
+
+A star is a line like "Part 1: ..." or "Star 2: ..."; days printing bare
+answers get their last lines taken as the stars. The 2024 days are not
+run as scripts: their answers and their parse and star times come from
+the Result (stars and laps) their solve() returns. Scripts working from the whole text (`f.read()`) count the parsing
+of it in their first star.
+
+Usage: python3 run.py [2019 2024/day06 ...] [--star 1|2] [--go] [--timeout S] [-j [JOBS]]
+"""
+import argparse
+import builtins
+import concurrent.futures
+import json
+import os
+import re
+import resource
+import runpy
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import traceback
+
+from typing import Dict, IO, List, NamedTuple, Optional, Sequence, Tuple
+
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+# Benchmark history, written by bench.py
+HISTORY = os.path.join(ROOT, "bench.json")
+
+YEARS = ("2017", "2018", "2019", "2021", "2022", "2024")
+
+# Arguments of the days that do not take their input file
+ARGUMENTS: Dict[str, Tuple[str, ...]] = {
+    "2017/day01": (),
+    "2017/day15": ("516", "190"),
+    "2018/day11": ("6303",),
+    "2018/day14": ("637061",),
+    "2019/day04": ("356261-846303",),
+    "2019/day25": ("solve", "input", "exclude"),
+}
+
+# Days computing a single star per run, by star
+STAR_ARGUMENTS: Dict[str, Dict[int, Tuple[str, ...]]] = {
+    "2017/day02": {1: ("input", "1"), 2: ("input", "2")},
+}
+
+STAR_LINE = re.compile(r"(?:part|star)\s*\(?(\d)\)?[^:]*:\s*(.*)", re.IGNORECASE)
+
+
+class Solver(NamedTuple):
+    # "2019/day09"
+    name: str
+    directory: str
+    convention: str
+    # Script or Go module directory
+    entry: str
+    # Input file, None when the day takes no file
+    input: Optional[str]
+
+
+class Result(NamedTuple):
+    solver: Solver
+    # Star number to (answer, seconds)
+    stars: Dict[int, Tuple[str, float]]
+    start: Optional[float]
+    parse: Optional[float]
+    total: float
+    # None when the solver ran fine
+    error: Optional[str]
+    # Peak resident set size in KiB, of the largest process when run once per star
+    rss: Optional[int] = None
+
+
+def discover(root: str = ROOT, years: Sequence[str] = YEARS, go: bool = False) -> List[Solver]:
+    solvers = []
+
+    for year in years:
+        base = os.path.join(root, year)
+        if not os.path.isdir(base):
+            continue
+
+        for day in sorted(os.listdir(base)):
+            directory = os.path.join(base, day)
+            if not day.startswith("day") or not os.path.isdir(directory):
+                continue
+
+            files = os.listdir(directory)
+            scripts = sorted((f for f in files if f.endswith(".py")), key=lambda f: (len(f), f))
+            inputs = [f for f in ("input", "input.txt") if f in files]
+            name = f"{year}/{day}"
+
+            if scripts:
+                entry = os.path.join(directory, scripts[0])
+                convention = "solve" if year >= "2024" else "argv"
+
+            elif go and "main.go" in files:
+                entry = directory
+                convention = "go"
+
+            else:
+                continue
+
+            solvers.append(Solver(name, directory, convention, entry,
+                                  os.path.join(directory, inputs[0]) if inputs else None))
+
+    return solvers
+
+
+def select(solvers: List[Solver], patterns: Sequence[str]) -> List[Solver]:
+    """Solvers whose name starts with any of the patterns ("2019", "2024/day06")."""
+    if not patterns:
+        return solvers
+
+    return [s for s in solvers if any(s.name == p or s.name.startswith(p.rstrip("/") + "/") for p in patterns)]
+
+
+def command(solver: Solver, star: Optional[int]) -> Optional[List[List[str]]]:
+    """Argument lists to run, one per process, None when the day has no input to run with."""
+    if solver.name in STAR_ARGUMENTS:
+        per_star = STAR_ARGUMENTS[solver.name]
+        return [list(per_star[n]) for n in sorted(per_star) if star is None or n == star]
+
+    if solver.name in ARGUMENTS:
+        return [list(ARGUMENTS[solver.name])]
+
+    if solver.input is None:
+        return None
+
+    args = [os.path.basename(solver.input)]
+
+    if solver.convention == "solve":
+        args += [str(star)] if star else []
+
+    elif solver.convention == "go":
+        args = ["-f"] + args
+
+    return [args]
+
+
+def stars(lines: List[Tuple[float, str]], mark: float, first: int = 1) -> Dict[int, Tuple[str, float]]:
+    """
+    Star answers and the time each one took, from the timestamped output
+    lines. Bare answers are numbered from `first`.
+    """
+    found: Dict[int, Tuple[str, float]] = {}
+    last: Optional[int] = None
+
+    for t, line in lines:
+        match = STAR_LINE.search(line.strip())
+
+        if match:
+            last = int(match.group(1))
+            found[last] = (match.group(2), max(t - mark, 0.0))
+            mark = t
+
+        elif last is not None and not found[last][0] and line.strip():
+            # Answer printed on the lines after the label
+            found[last] = (line.strip(), found[last][1])
+
+    if found:
+        return found
+
+    # Bare answers, the last lines of the output
+    answers = [(t, line.strip()) for t, line in lines if line.strip()][-2:]
+    for n, (t, answer) in enumerate(answers, start=first):
+        found[n] = (answer, max(t - mark, 0.0))
+        mark = t
+
+    return found
+
+
+def runtimes(path: str = HISTORY) -> Dict[str, float]:
+    """Latest median seconds of every day in the benchmark history."""
+    if not os.path.exists(path):
+        return {}
+
+    with open(path, "r") as f:
+        history = json.load(f)
+
+    found: Dict[str, float] = {}
+    for entry in history.values():
+        for name, day in entry["days"].items():
+            found[name] = day["median"]
+
+    return found
+
+
+def schedule(solvers: List[Solver], known: Dict[str, float]) -> List[int]:
+    """
+    Indexes of the solvers, longest first, the ones without history taken
+    as longest of all. Handing them out in this order keeps a heavy day
+    from starting last.
+    """
+    return sorted(range(len(solvers)), key=lambda i: -known.get(solvers[i].name, float("inf")))
+
+
+def run_all(solvers: List[Solver], star: Optional[int], timeout: Optional[float], jobs: int,
+            known: Dict[str, float]) -> List[Result]:
+    """Results of every solver in their order, `jobs` at a time."""
+    results: List[Optional[Result]] = [None] * len(solvers)
+
+    # Solvers are processes of their own, threads only wait on them
+    with concurrent.futures.ThreadPoolExecutor(max_workers=jobs) as pool:
+        futures = {pool.submit(run, solvers[i], star, timeout): i for i in schedule(solvers, known)}
+
+        for future in concurrent.futures.as_completed(futures):
+            i = futures[future]
+
+            try:
+                result = future.result()
+            except Exception as e:
+                result = Result(solvers[i], {}, None, None, 0.0, f"{type(e).__name__}: {e}")
+
+            results[i] = result
+            print(f"{result.solver.name}: {result.total:.3f}s" + (f" ({result.error})" if result.error else ""),
+                  file=sys.stderr)
+
+    return [r for r in results if r is not None]
+
+
+def run(solver: Solver, star: Optional[int] = None, timeout: Optional[float] = None) -> Result:
+    commands = command(solver, star)
+    if commands is None:
+        return Result(solver, {}, None, None, 0.0, "no input in the tree")
+
+    if solver.convention == "go":
+        return run_go(solver, commands[0], timeout)
+
+    found: Dict[int, Tuple[str, float]] = {}
+    start = parse = rss = None
+    total = 0.0
+
+    # Days run once per star number their bare answers after it
+    numbers = sorted(STAR_ARGUMENTS.get(solver.name, {1: ()}))
+    if star is not None and solver.name in STAR_ARGUMENTS:
+        numbers = [star]
+
+    for first, args in zip(numbers, commands):
+        report, elapsed, error = spawn(solver, args, timeout)
+        total += elapsed
+
+        if error is not None:
+            return Result(solver, found, start, parse, total, error)
+
+        rss = max(rss or 0, report["rss"])
+        start = (start or 0.0) + report["start"]
+
+        if solver.convention == "solve":
+            laps = report["laps"]
+            parse = laps.get("parse")
+            # JSON object keys are strings
+            found.update((int(n), (answer, laps.get(f"star {n}", 0.0))) for n, answer in report["stars"].items())
+            continue
+
+        if report["input"] is not None:
+            parse = (parse or 0.0) + report["input"]
+
+        mark = report["input"] if report["input"] is not None else 0.0
+        found.update(stars(report["lines"], mark, first))
+
+    if star is not None:
+        found = {n: v for n, v in found.items() if n == star}
+
+    return Result(solver, found, start, parse, total, None, rss)
+
+
+def spawn(solver: Solver, args: List[str], timeout: Optional[float]) -> Tuple[dict, float, Optional[str]]:
+    """Run a Python solver under child() (or solve_child() for the 2024 days), returning its report."""
+    watched = solver.input if solver.input is not None else ""
+
+    with tempfile.NamedTemporaryFile("r", suffix=".json") as f:
+        if solver.convention == "solve":
+            cmd = [sys.executable, os.path.abspath(__file__), "--solve", f.name, solver.entry] + args
+        else:
+            cmd = [sys.executable, os.path.abspath(__file__), "--child", f.name, watched, solver.entry] + args
+        begin = time.perf_counter()
+
+        proc = subprocess.Popen(cmd, cwd=solver.directory, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+
+        try:
+            _, stderr = proc.communicate(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+            proc.communicate()
+            return {}, time.perf_counter() - begin, f"timeout after {timeout}s"
+
+        elapsed = time.perf_counter() - begin
+        raw = f.read()
+
+    lines = stderr.decode(errors="replace").strip().splitlines()
+
+    if not raw:
+        return {}, elapsed, lines[-1] if lines else f"exit status {proc.returncode}"
+
+    report = json.loads(raw)
+    report["start"] = elapsed - report["elapsed"]
+    report["stderr"] = lines
+
+    if report["exit"]:
+        return report, elapsed, lines[-1] if lines else f"exit status {report['exit']}"
+
+    return report, elapsed, None
+
+
+def run_go(solver: Solver, args: List[str], timeout: Optional[float]) -> Result:
+    with tempfile.TemporaryDirectory() as tmp:
+        binary = os.path.join(tmp, solver.name.replace("/", "_"))
+
+        begin = time.perf_counter()
+        try:
+            build = subprocess.run(["go", "build", "-o", binary, "."], cwd=solver.directory, capture_output=True,
+                                   timeout=timeout)
+        except subprocess.TimeoutExpired:
+            start = time.perf_counter() - begin
+            return Result(solver, {}, start, None, start, f"build timeout after {timeout}s")
+
+        start = time.perf_counter() - begin
+
+        if build.returncode:
+            errors = build.stderr.decode(errors="replace").strip().splitlines()
+            return Result(solver, {}, start, None, start, errors[-1] if errors else "build failed")
+
+        begin = time.perf_counter()
+        proc = subprocess.Popen([binary] + args, cwd=solver.directory, stdout=subprocess.PIPE,
+                                stderr=subprocess.DEVNULL, text=True)
+
+        # Timestamped as they arrive, Go flushes every Printf
+        lines: List[Tuple[float, str]] = []
+        usage: List[resource.struct_rusage] = []
+
+        def reader():
+            assert proc.stdout is not None
+            for line in proc.stdout:
+                lines.append((time.perf_counter() - begin, line))
+
+            # wait4() rather than wait() for the resource usage of the solver alone
+            _, status, rusage = os.wait4(proc.pid, 0)
+            proc.returncode = os.waitstatus_to_exitcode(status)
+            usage.append(rusage)
+
+        # The deadline holds even when the solver prints nothing
+        thread = threading.Thread(target=reader, daemon=True)
+        thread.start()
+        thread.join(timeout)
+
+        timed_out = thread.is_alive()
+        if timed_out:
+            proc.kill()
+            thread.join()
+
+        total = time.perf_counter() - begin
+
+    if timed_out:
+        error: Optional[str] = f"timeout after {timeout}s"
+    else:
+        error = None if proc.returncode == 0 else f"exit status {proc.returncode}"
+
+    return Result(solver, stars(lines, 0.0), start, None, start + total, error, usage[0].ru_maxrss)
+
+
+class _Watched:
+    """Input file proxy noting when the solver has read all of it."""
+
+    def __init__(self, f: IO, events: dict, begin: float):
+        self._f = f
+        self._events = events
+        self._begin = begin
+
+    def _done(self):
+        if self._events["input"] is None:
+            self._events["input"] = time.perf_counter() - self._begin
+
+    def read(self, *args):
+        data = self._f.read(*args)
+        if not args or args[0] is None or args[0] < 0 or not data:
+            self._done()
+        return data
+
+    def readline(self, *args):
+        line = self._f.readline(*args)
+        if not line:
+            self._done()
+        return line
+
+    def readlines(self, *args):
+        lines = self._f.readlines(*args)
+        self._done()
+        return lines
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        try:
+            return next(self._f)
+        except StopIteration:
+            self._done()
+            raise
+
+    def close(self):
+        self._done()
+        self._f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __getattr__(self, name):
+        return getattr(self._f, name)
+
+
+class _Lines:
+    """stdout replacement timestamping every line written."""
+
+    def __init__(self, events: dict, begin: float):
+        self._events = events
+        self._begin = begin
+        self._partial = ""
+
+    def write(self, text: str) -> int:
+        now = time.perf_counter() - self._begin
+        *complete, self._partial = (self._partial + text).split("\n")
+
+        for line in complete:
+            self._events["lines"].append((now, line))
+
+        return len(text)
+
+    def flush(self):
+        pass
+
+    def isatty(self) -> bool:
+        return False
+
+
+def child(report: str, watched: str, script: str, args: List[str]):
+    """Run a solver script as __main__, writing its timings to `report` as JSON."""
+    begin = time.perf_counter()
+    events: dict = {"input": None, "lines": [], "exit": 0}
+
+    real_open = builtins.open
+
+    def watching_open(file, *a, **kw):
+        f = real_open(file, *a, **kw)
+        if watched and isinstance(file, str) and os.path.abspath(file) == watched:
+            return _Watched(f, events, begin)
+        return f
+
+    builtins.open = watching_open
+    sys.argv = [script] + args
+    sys.path[0] = os.path.dirname(script)
+    lines = _Lines(events, begin)
+    sys.stdout = lines  # type: ignore
+
+    try:
+        runpy.run_path(script, run_name="__main__")
+
+    except SystemExit as e:
+        events["exit"] = e.code if isinstance(e.code, int) else 1
+
+    except BaseException:
+        events["exit"] = 1
+        traceback.print_exc()
+
+    finally:
+        sys.stdout = sys.__stdout__
+        builtins.open = real_open
+
+        if lines._partial:
+            events["lines"].append((time.perf_counter() - begin, lines._partial))
+
+        finish(report, events, begin)
+
+
+def solve_child(report: str, script: str, args: List[str]):
+    """
+    Import a 2024 solve.py and call its solve() on the input (and star) in
+    args, writing the answers and laps of the Result it returns to `report`.
+    """
+    begin = time.perf_counter()
+    events: dict = {"stars": {}, "laps": {}, "exit": 0}
+
+    sys.path[0] = os.path.dirname(script)
+
+    try:
+        module = runpy.run_path(script, run_name="solve")
+        star = module["Star"](int(args[1])) if len(args) > 1 else module["Star"].ALL
+
+        with open(args[0]) as f:
+            result = module["solve"](f, star, module["Stopwatch"]())
+
+        events["stars"] = {s.value: str(answer) for s, answer in result.stars.items()}
+        events["laps"] = result.laps
+
+    except BaseException:
+        events["exit"] = 1
+        traceback.print_exc()
+
+    finally:
+        finish(report, events, begin)
+
+
+def finish(report: str, events: dict, begin: float):
+    """Write the events of a child process to `report`, with its time and peak memory."""
+    events["elapsed"] = time.perf_counter() - begin
+    # Largest of the solver and the workers it waited for (process pools)
+    events["rss"] = max(resource.getrusage(who).ru_maxrss
+                        for who in (resource.RUSAGE_SELF, resource.RUSAGE_CHILDREN))
+
+    with open(report, "w") as f:
+        json.dump(events, f)
+
+
+def seconds(value: Optional[float]) -> str:
+    return f"{value:8.3f}" if value is not None else f"{'-':>8}"
+
+
+def table(results: List[Result], star: Optional[int] = None) -> str:
+    numbers = [star] if star else [1, 2]
+    width = max((len(r.solver.name) for r in results), default=3)
+
+    header = f"{'day':<{width}} {'start':>8} {'parse':>8} " + " ".join(f"{'star ' + str(n):>8}" for n in numbers)
+    lines = [f"{header} {'total':>8}  answers"]
+
+    for r in results:
+        row = f"{r.solver.name:<{width}} {seconds(r.start)} {seconds(r.parse)} "
+        row += " ".join(seconds(r.stars[n][1] if n in r.stars else None) for n in numbers)
+        row += f" {seconds(r.total)}  "
+
+        if r.error is not None:
+            row += f"! {r.error}"
+        else:
+            row += " / ".join(r.stars[n][0][:20] if n in r.stars else "?" for n in numbers)
+
+        lines.append(row)
+
+    total = sum(r.total for r in results)
+    failed = sum(r.error is not None for r in results)
+    lines.append(f"{len(results)} days in {total:.3f}s, {failed} without answers")
+
+    return "\n".join(lines)
+
+
+def main(argv: Optional[Sequence[str]] = None):
+    parser = argparse.ArgumentParser(description="Run and time the solvers of every year")
+    parser.add_argument("days", nargs="*", help="years or days to run (2019, 2024/day06), all by default")
+    parser.add_argument("-s", "--star", type=int, choices=(1, 2), help="run (or report) only this star")
+    parser.add_argument("--go", action="store_true", help="include the Go days (needs the go toolchain)")
+    parser.add_argument("--timeout", type=float, help="seconds before a day is killed")
+    parser.add_argument("-j", "--jobs", type=int, nargs="?", const=os.cpu_count() or 1, default=1,
+                        help="days run at once, one per CPU when no count is given (default 1)")
+    args = parser.parse_args(argv)
+
+    if args.jobs < 1:
+        parser.error("at least one job is needed")
+
+    if args.go and shutil.which("go") is None:
+        parser.error("go toolchain not found")
+
+    solvers = select(discover(go=args.go), args.days)
+
+    results = run_all(solvers, args.star, args.timeout, args.jobs, runtimes())
+
+    print(table(results, args.star))
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "--child":
+        child(sys.argv[2], sys.argv[3], sys.argv[4], sys.argv[5:])
+    elif len(sys.argv) > 1 and sys.argv[1] == "--solve":
+        solve_child(sys.argv[2], sys.argv[3], sys.argv[4:])
+    else:
+        main(sys.argv[1:])
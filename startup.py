@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Audits the startup cost of the solvers.
+
+Every Python solver has its module level (its imports and definitions,
+not its __main__ block) run under -X importtime in a fresh interpreter.
+Its import phase is the time that takes, with the modules it imports
+for the first time ranked by their cumulative import time. Interpreter
+startup itself is measured once and reported apart.
+
+Solvers whose import phase is over the budget are flagged, and make the
+exit status 1. Modules only some runs need (plotting, visualization) are
+best imported in the function using them.
+
+Usage: python3 startup.py [2019 2024/day06 ...] [--budget MS] [--top N]
+"""
+import argparse
+import json
+import subprocess
+import sys
+
+from typing import List, NamedTuple, Optional, Sequence, Tuple
+
+import run
+
+from run import Solver
+
+
+# Separates the imports of interpreter startup from the ones of the solver
+MARKER = "startup.py: solver imports"
+
+# Run in the audited interpreter, with the script and its directory as arguments
+AUDIT = f"""
+import pkgutil, runpy, sys, time  # runpy imports pkgutil when called
+script = sys.argv[1]
+sys.path[0] = sys.argv[2]
+sys.argv = [script]
+print({MARKER!r}, file=sys.stderr, flush=True)
+begin = time.perf_counter()
+runpy.run_path(script, run_name="__startup__")
+print(time.perf_counter() - begin)
+"""
+
+
+class Audit(NamedTuple):
+    solver: Solver
+    # Seconds running the module level
+    elapsed: float
+    # (module, cumulative seconds) of the top level imports, heaviest first
+    imports: List[Tuple[str, float]]
+    error: Optional[str]
+
+
+def importtime(lines: List[str]) -> List[Tuple[str, float]]:
+    """Top level imports (not the ones they trigger) in -X importtime output, heaviest first."""
+    found = []
+
+    for line in lines:
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+
+        _, cumulative, name = line.split("|")
+        if not name.startswith("  ") and cumulative.strip().isdigit():
+            found.append((name.strip(), int(cumulative) / 1e6))
+
+    return sorted(found, key=lambda i: -i[1])
+
+
+def audit(solver: Solver) -> Audit:
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", AUDIT, solver.entry, solver.directory],
+                          cwd=solver.directory, capture_output=True, text=True, timeout=60)
+
+    stderr = proc.stderr.splitlines()
+    after = stderr[stderr.index(MARKER) + 1:] if MARKER in stderr else []
+
+    if proc.returncode:
+        errors = [line for line in after if not line.startswith("import time:")]
+        return Audit(solver, 0.0, [], errors[-1] if errors else f"exit status {proc.returncode}")
+
+    return Audit(solver, float(proc.stdout.splitlines()[-1]), importtime(after), None)
+
+
+def interpreter() -> float:
+    """Seconds of startup of a bare interpreter, best of a few."""
+    best = float("inf")
+
+    for _ in range(5):
+        proc = subprocess.run([sys.executable, "-X", "importtime", "-c", "pass"], capture_output=True, text=True)
+        best = min(best, sum(s for _, s in importtime(proc.stderr.splitlines())))
+
+    return best
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Audit the import time of the solvers")
+    parser.add_argument("days", nargs="*", help="years or days to audit (2019, 2024/day06), all by default")
+    parser.add_argument("--budget", type=float, default=50, help="milliseconds allowed per solver (default 50)")
+    parser.add_argument("--top", type=int, default=3, help="heaviest imports shown per solver (default 3)")
+    parser.add_argument("--json", action="store_true", help="print the audit as JSON")
+    args = parser.parse_args(argv)
+
+    solvers = [s for s in run.select(run.discover(), args.days) if s.convention != "go"]
+    audits = [audit(s) for s in solvers]
+    base = interpreter()
+
+    failing = [a for a in audits if a.error is not None or a.elapsed * 1000 > args.budget]
+
+    if args.json:
+        print(json.dumps({
+            "interpreter": base,
+            "solvers": {a.solver.name: {"elapsed": a.elapsed, "imports": dict(a.imports), "error": a.error}
+                        for a in audits},
+        }, indent=2))
+
+        return 1 if failing else 0
+
+    width = max((len(a.solver.name) for a in audits), default=3)
+    print(f"interpreter startup imports: {base * 1000:.1f} ms")
+
+    for a in audits:
+        if a.error is not None:
+            print(f"{a.solver.name:<{width}} {'-':>8}  ! {a.error}")
+            continue
+
+        heaviest = ", ".join(f"{name} {secs * 1000:.1f}" for name, secs in a.imports[:args.top])
+        print(f"{a.solver.name:<{width}} {a.elapsed * 1000:8.1f}  {'!' if a in failing else ' '} {heaviest}")
+
+    print(f"{len(audits)} solvers, {len(failing)} over {args.budget:g} ms or failing")
+
+    return 1 if failing else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))